@@ -7,10 +7,36 @@
 - Professional UI with comprehensive exercise information
 """
 
-from flask import Flask, render_template_string, jsonify, request, session, redirect, url_for
-from functools import wraps
+from flask import Flask, render_template, jsonify, request, session, redirect, url_for, send_file, abort, g, has_app_context
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import is_resource_modified
+from werkzeug.local import LocalProxy
+from collections import OrderedDict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import lru_cache, wraps
+import csv
+import gzip
+import hashlib
 import json
+import math
+import mmap
 import os
+import pickle
+import re
+import sqlite3
+import sys
+import threading
+import time
+import tracemalloc
+from types import MappingProxyType
+from urllib.parse import quote, urlencode
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
 
 app = Flask(__name__)
 app.secret_key = 'workout_tracker_secret_key_2024'
@@ -32,8 +58,8 @@ def login():
             session['logged_in'] = True
             return redirect(url_for('index'))
         else:
-            return render_template_string(LOGIN_TEMPLATE, error="Invalid password")
-    return render_template_string(LOGIN_TEMPLATE)
+            return render_template(LOGIN_PAGE, error="Invalid password")
+    return render_template(LOGIN_PAGE)
 
 @app.route('/logout')
 def logout():
@@ -46,55 +72,587 @@ def robots_txt():
 Disallow: /
 """
 
+class CatalogRecord(Mapping):
+    """
+    Read-only catalog record kept in __slots__ rather than a per-record dict.
+    Reads like the JSON object it was built from; strings are interned so values
+    repeated across the catalog (muscles, equipment, reps...) are stored once.
+    """
+    
+    __slots__ = ('_extra',)
+    FIELDS = ()
+    # field -> record class for lists of nested objects
+    NESTED = {}
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.FIELD_SET = frozenset(cls.FIELDS)
+    
+    def __init__(self, data):
+        # Unknown keys are kept too, so no catalog data is dropped
+        extra = {}
+        for field, value in data.items():
+            value = self.compact(value, self.NESTED.get(field))
+            if field in self.FIELD_SET:
+                object.__setattr__(self, field, value)
+            else:
+                extra[sys.intern(field)] = value
+        object.__setattr__(self, '_extra', extra or None)
+    
+    def __setattr__(self, name, value):
+        # Records are shared by every thread serving the catalog; derive new ones instead
+        raise AttributeError(f'{type(self).__name__} is read-only')
+    
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is read-only')
+    
+    def __reduce__(self):
+        return type(self), (dict(self),)
+    
+    @staticmethod
+    def compact(value, record_class=None):
+        """Intern strings and turn lists into tuples (of records, for nested objects)"""
+        if isinstance(value, str):
+            return sys.intern(value)
+        if isinstance(value, list):
+            return tuple(
+                record_class(item) if record_class and isinstance(item, dict) else CatalogRecord.compact(item)
+                for item in value
+            )
+        return value
+    
+    def __getitem__(self, key):
+        if key in self.FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                # Optional field this record does not have
+                raise KeyError(key) from None
+        if self._extra and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+    
+    def __iter__(self):
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self):
+        return sum(1 for _ in self)
+    
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
+
+class SubstitutionRecord(CatalogRecord):
+    FIELDS = ('id', 'name', 'muscle', 'equipment', 'body_part')
+    __slots__ = FIELDS
+
+class RangeRecord(CatalogRecord):
+    FIELDS = ('min', 'max')
+    __slots__ = FIELDS
+
+class PrescriptionRecord(CatalogRecord):
+    FIELDS = ('reps', 'early_rpe', 'last_rpe', 'warmup_sets', 'working_sets', 'rest_seconds')
+    __slots__ = FIELDS
+
+class ExerciseRecord(CatalogRecord):
+    FIELDS = (
+        'id', 'name', 'week', 'workout_type', 'body_part', 'body_part_id', 'training_focus',
+        'training_focus_id', 'muscle', 'muscle_id', 'equipment', 'equipment_id', 'reps',
+        'early_rpe', 'last_rpe', 'warmup_sets', 'working_sets', 'rest', 'notes', 'tutorial_url',
+        'substitutions', 'substitution_details', 'day', 'workout_type_id', 'tags', 'prescription'
+    )
+    __slots__ = FIELDS
+    NESTED = {'substitutions': SubstitutionRecord, 'substitution_details': SubstitutionRecord}
+
+class CatalogJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes catalog records as the objects they were loaded from"""
+    
+    @staticmethod
+    def default(o):
+        if isinstance(o, Mapping):
+            return dict(o)
+        return DefaultJSONProvider.default(o)
+
+app.json = CatalogJSONProvider(app)
+
+# "6-8", "~8-9", "2", "1-2 min", "90 sec": a number or range, then an optional time unit
+PRESCRIPTION_RANGE = re.compile(r'(\d+(?:\.\d+)?)(?:\s*-\s*(\d+(?:\.\d+)?))?\s*(min|sec|m|s)?')
+REST_UNIT_SECONDS = {'min': 60, 'm': 60, 'sec': 1, 's': 1}
+
+def parse_range(value, seconds=False):
+    """
+    Numeric {min, max} of a prescription value, or None if it has no number.
+    With seconds=True the value is a duration (minutes unless it says otherwise) returned in seconds.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        low = high = value
+        unit = 'min'
+    else:
+        match = PRESCRIPTION_RANGE.search(str(value or ''))
+        if not match:
+            return None
+        low = float(match[1])
+        high = float(match[2]) if match[2] else low
+        unit = match[3] or 'min'
+    if seconds:
+        low, high = low * REST_UNIT_SECONDS[unit], high * REST_UNIT_SECONDS[unit]
+    low, high = sorted((low, high))
+    return RangeRecord({
+        'min': int(low) if low == int(low) else low,
+        'max': int(high) if high == int(high) else high
+    })
+
+@lru_cache(maxsize=None)
+def _parse_prescription(reps, early_rpe, last_rpe, warmup_sets, working_sets, rest):
+    # Few distinct prescriptions exist, so exercises that share one share the record
+    ranges = {
+        'reps': parse_range(reps),
+        'early_rpe': parse_range(early_rpe),
+        'last_rpe': parse_range(last_rpe),
+        'warmup_sets': parse_range(warmup_sets),
+        'working_sets': parse_range(working_sets),
+        'rest_seconds': parse_range(rest, seconds=True)
+    }
+    return PrescriptionRecord({field: value for field, value in ranges.items() if value is not None})
+
+def parse_prescription(exercise):
+    """The exercise's free-text prescription (reps, RPE, sets, rest) as numeric min/max ranges"""
+    values = [exercise.get(field) for field in ('reps', 'early_rpe', 'last_rpe', 'warmup_sets', 'working_sets', 'rest')]
+    try:
+        return _parse_prescription(*values)
+    except TypeError:
+        # Unhashable (list or object) values: parse without sharing
+        return _parse_prescription.__wrapped__(*values)
+
+def freeze(value):
+    """Read-only view of parsed JSON: dicts become mapping proxies and lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class ExerciseSearchIndex:
+    """Inverted index over exercise text fields, with prefix and trigram fuzzy term matching"""
+    
+    FIELD_WEIGHTS = {
+        'name': 3.0,
+        'muscle': 2.0,
+        'equipment': 2.0,
+        'body_part': 1.5,
+        'tags': 1.5,
+        'notes': 0.5
+    }
+    FUZZY_THRESHOLD = 0.4
+    PREFIX_SIMILARITY = 0.9
+    CACHE_SIZE = 1024
+    
+    def __init__(self, exercises):
+        self.exercises = tuple(exercises)
+        
+        # term -> {document: summed field weight}
+        self.postings = {}
+        for doc_id, exercise in enumerate(self.exercises):
+            for field, weight in self.FIELD_WEIGHTS.items():
+                value = exercise.get(field) or ''
+                text = ' '.join(value) if isinstance(value, (list, tuple)) else str(value)
+                for term in self.tokenize(text):
+                    doc_weights = self.postings.setdefault(term, {})
+                    doc_weights[doc_id] = doc_weights.get(doc_id, 0.0) + weight
+        
+        total = len(self.exercises)
+        self.idf = {term: math.log(1 + total / len(docs)) for term, docs in self.postings.items()}
+        
+        # trigram -> vocabulary terms containing it, for typo-tolerant lookups
+        self.terms_by_trigram = {}
+        for term in self.postings:
+            for gram in self.trigrams(term):
+                self.terms_by_trigram.setdefault(gram, set()).add(term)
+        
+        self._expansions = {}
+        self._results = {}
+    
+    @staticmethod
+    def tokenize(text):
+        """Lowercase alphanumeric tokens, so '45° Incline DB Press' -> ['45', 'incline', 'db', 'press']"""
+        return re.findall(r'[a-z0-9]+', text.lower())
+    
+    @staticmethod
+    def trigrams(term):
+        padded = f'  {term} '
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+    
+    def expand(self, token):
+        """Vocabulary terms matching token exactly, by prefix or by trigram similarity -> similarity"""
+        matches = self._expansions.get(token)
+        if matches is not None:
+            return matches
+        
+        matches = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        grams = self.trigrams(token)
+        shared_counts = {}
+        for gram in grams:
+            for term in self.terms_by_trigram.get(gram, ()):
+                shared_counts[term] = shared_counts.get(term, 0) + 1
+        for term, shared in shared_counts.items():
+            if term in matches:
+                continue
+            if term.startswith(token):
+                matches[term] = self.PREFIX_SIMILARITY
+                continue
+            similarity = shared / (len(grams) + len(self.trigrams(term)) - shared)
+            if similarity >= self.FUZZY_THRESHOLD:
+                matches[term] = similarity
+        
+        if len(self._expansions) >= self.CACHE_SIZE:
+            self._expansions = {}
+        self._expansions[token] = matches
+        return matches
+    
+    def search(self, query, unique_names=True):
+        """
+        Rank exercises for a free-text query as ((exercise, score), ...).
+        Exercises matching more of the query's words come first, then by tf-idf score.
+        With unique_names, only the best-ranked exercise of each name is kept.
+        """
+        tokens = tuple(dict.fromkeys(self.tokenize(query)))
+        key = (tokens, unique_names)
+        results = self._results.get(key)
+        if results is not None:
+            return results
+        
+        scores = {}
+        coverage = {}
+        for token in tokens:
+            # Best match per document for this token, so fuzzy variants do not add up
+            best = {}
+            for term, similarity in self.expand(token).items():
+                idf = self.idf[term]
+                for doc_id, weight in self.postings[term].items():
+                    score = similarity * idf * weight
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+                coverage[doc_id] = coverage.get(doc_id, 0) + 1
+        
+        results = []
+        seen_names = set()
+        for doc_id in sorted(scores, key=lambda d: (-coverage[d], -scores[d], d)):
+            exercise = self.exercises[doc_id]
+            if unique_names:
+                if exercise['name'] in seen_names:
+                    continue
+                seen_names.add(exercise['name'])
+            results.append((exercise, scores[doc_id]))
+        
+        # Cached and shared between threads, so hand out an immutable tuple
+        results = tuple(results)
+        if len(self._results) >= self.CACHE_SIZE:
+            self._results = {}
+        self._results[key] = results
+        return results
+
+# int.bit_count() is Python 3.10+
+popcount = getattr(int, 'bit_count', None) or (lambda bits: bin(bits).count('1'))
+
+class FacetIndex:
+    """
+    Precomputed bitsets for faceted filtering: bit i of a value's bitset is set when
+    exercise i has that value. OR within a facet, AND across facets.
+    """
+    
+    FACETS = (
+        'week', 'workout_type', 'muscle', 'muscle_group', 'equipment', 'equipment_category',
+        'mobility', 'resistance_type', 'body_part', 'body_part_category', 'training_focus'
+    )
+    
+    def __init__(self, exercises, facet_values):
+        self.exercises = tuple(exercises)
+        self.all_bits = (1 << len(self.exercises)) - 1
+        self.bitsets = {facet: {} for facet in self.FACETS}
+        # Bits of the first exercise with each name, for counting distinct exercises
+        self.unique_name_bits = 0
+        seen_names = set()
+        for position, exercise in enumerate(self.exercises):
+            bit = 1 << position
+            for facet, value in facet_values(exercise).items():
+                if value is not None:
+                    bitsets = self.bitsets[facet]
+                    bitsets[value] = bitsets.get(value, 0) | bit
+            if exercise['name'] not in seen_names:
+                seen_names.add(exercise['name'])
+                self.unique_name_bits |= bit
+    
+    def query(self, selections, unique_names=False):
+        """
+        Apply {facet: [values]} selections and return (matching bits, facet counts).
+        Each facet's counts ignore that facet's own selection, so every value shows
+        how many results picking it (too) would give.
+        """
+        base = self.unique_name_bits if unique_names else self.all_bits
+        masks = {}
+        for facet, values in selections.items():
+            mask = 0
+            for value in values:
+                mask |= self.bitsets[facet].get(value, 0)
+            masks[facet] = mask
+        
+        matches = base
+        for mask in masks.values():
+            matches &= mask
+        
+        counts = {}
+        for facet, bitsets in self.bitsets.items():
+            others = base
+            for other, mask in masks.items():
+                if other != facet:
+                    others &= mask
+            counts[facet] = {value: popcount(bits & others) for value, bits in bitsets.items()}
+        return matches, counts
+    
+    def members(self, bits):
+        """Exercises whose bits are set, in catalog order"""
+        exercises = []
+        while bits:
+            lowest = bits & -bits
+            exercises.append(self.exercises[lowest.bit_length() - 1])
+            bits ^= lowest
+        return exercises
+
+def atomic_write(path, data):
+    """
+    Write bytes (or an iterable of byte chunks) to path through a temporary file and a rename,
+    so concurrent workers never read a partial file. Raises OSError, leaving no temporary file behind.
+    """
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            if isinstance(data, bytes):
+                f.write(data)
+            else:
+                f.writelines(data)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+CATALOG_PATH = 'workout_database.json'
+# Pickled, fully indexed copy of the catalog so workers skip parsing and indexing on boot
+CATALOG_SNAPSHOT_PATH = os.environ.get('WORKOUT_CATALOG_SNAPSHOT', 'workout_database.snapshot')
+# Bump whenever the indexed structures change shape, so older snapshots get rebuilt
+CATALOG_SNAPSHOT_FORMAT = 4
+
 # Enhanced Workout Database Class
 class UltimateWorkoutDatabase:
     """Ultimate workout database with improved equipment categorization"""
     
-    def __init__(self):
+    def __init__(self, path=CATALOG_PATH, snapshot_path=CATALOG_SNAPSHOT_PATH):
         # Load the correct JSON database (main exercises only)
-        with open('workout_database.json', 'r') as f:
-            self.database = json.load(f)
-        
-        print(f"🚀 Loaded Ultimate Workout Database:")
-        print(f"   • Muscles: {len(self.database.get('muscles', {}))}")
-        print(f"   • Equipment: {len(self.database.get('equipment', {}))}")
-        print(f"   • Exercises: {len(self.database.get('exercises', []))}")
+        with open(path, 'rb') as f:
+            raw = f.read()
+            mtime = os.fstat(f.fileno()).st_mtime
+        self.version = self.content_version(raw)
+        
+        source = 'snapshot'
+        if not self._load_snapshot(snapshot_path):
+            source = 'JSON'
+            self.database = json.loads(raw)
+            self._build_indexes()
+            self._write_snapshot(snapshot_path)
+        # Last-Modified for catalog responses (HTTP dates have whole-second precision)
+        self.modified = datetime.fromtimestamp(int(mtime), timezone.utc)
+        self._freeze()
+        
+        app.logger.info("🚀 Loaded Ultimate Workout Database from %s (%s): %d muscles, %d equipment, %d exercises",
+                        source, self.version, len(self.database.get('muscles', {})),
+                        len(self.database.get('equipment', {})), len(self.exercises))
+    
+    def _load_snapshot(self, snapshot_path):
+        """Restore the indexed catalog from a snapshot of this exact JSON; False if there is none"""
+        if not snapshot_path:
+            return False
+        try:
+            with open(snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            app.logger.warning("⚠️ Ignoring unreadable catalog snapshot %s: %s", snapshot_path, e)
+            return False
+        if not isinstance(snapshot, dict) or snapshot.get('format') != CATALOG_SNAPSHOT_FORMAT \
+                or snapshot.get('version') != self.version:
+            return False
+        self.__dict__.update(snapshot['state'])
+        return True
+    
+    def _write_snapshot(self, snapshot_path):
+        """Save the indexed catalog for the next boot; a read-only disk just means no snapshot"""
+        if not snapshot_path:
+            return
+        snapshot = {'format': CATALOG_SNAPSHOT_FORMAT, 'version': self.version, 'state': self.__dict__}
+        try:
+            # Atomic, so workers booting together never read a half-written snapshot
+            atomic_write(snapshot_path, pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+        except OSError as e:
+            app.logger.warning("⚠️ Could not write catalog snapshot %s: %s", snapshot_path, e)
+    
+    @staticmethod
+    def content_version(raw):
+        """Content hash of the catalog JSON, used to version caches derived from it"""
+        return hashlib.sha256(raw).hexdigest()[:16]
+    
+    @staticmethod
+    def normalize_week(week):
+        """Normalize a week key so 1, '1' and ' 1 ' all map to the same index entry"""
+        if isinstance(week, str):
+            week = week.strip()
+            if week.isdigit():
+                return int(week)
+        return week
+    
+    def _build_indexes(self):
+        """Build the lookup indexes once so request-time lookups are O(1)"""
+        exercises = self.database['exercises']
+        if isinstance(exercises, dict):
+            exercises = list(exercises.values())
+        # Tags and numeric prescriptions are derived once here, then every exercise becomes a compact record
+        exercises = tuple(
+            ExerciseRecord(dict(
+                exercise,
+                tags=self.generate_comprehensive_tags(exercise),
+                prescription=parse_prescription(exercise)
+            ))
+            for exercise in exercises
+        )
+        self.database['exercises'] = self.exercises = exercises
+        
+        self.exercises_by_id = {}
+        # exercise_id -> position in catalog order, for keyset pagination
+        self.exercise_positions = {}
+        grouped = {}
+        for position, exercise in enumerate(exercises):
+            self.exercise_positions.setdefault(exercise['id'], position)
+            # Keep the first match for duplicate IDs
+            self.exercises_by_id.setdefault(exercise['id'], exercise)
+            week = self.normalize_week(exercise.get('week'))
+            grouped.setdefault((week, exercise.get('workout_type')), []).append(exercise)
+        
+        # (week, workout_type) -> exercises in catalog order
+        self.exercises_by_workout = {key: tuple(group) for key, group in grouped.items()}
+        
+        # week -> sorted workout types
+        types_by_week = {}
+        for week, workout_type in self.exercises_by_workout:
+            types_by_week.setdefault(week, set()).add(workout_type)
+        self.workout_types_by_week = {
+            week: tuple(sorted(types)) for week, types in types_by_week.items()
+        }
+        self.weeks = tuple(sorted(self.workout_types_by_week, key=lambda x: (isinstance(x, str), x)))
+        
+        self.exercise_ids_by_tag = {}
+        for exercise in exercises:
+            for tag in exercise['tags']:
+                self.exercise_ids_by_tag.setdefault(tag, set()).add(exercise['id'])
+        self.exercise_ids_by_tag = {tag: frozenset(ids) for tag, ids in self.exercise_ids_by_tag.items()}
+        
+        self.search_index = ExerciseSearchIndex(exercises)
+        self.facet_index = FacetIndex(exercises, self.get_facet_values)
+        
+        # (original_id, substitution_id) -> substitution object
+        self.substitutions_by_id = {}
+        for exercise_id, exercise in self.exercises_by_id.items():
+            for sub in exercise.get('substitutions', []):
+                if isinstance(sub, Mapping) and 'id' in sub:
+                    self.substitutions_by_id.setdefault((exercise_id, sub['id']), sub)
+    
+    def _freeze(self):
+        """Expose the catalog and its indexes read-only, so threads share them without locks or copies"""
+        self.database = freeze(self.database)
+        for name in ('exercises_by_id', 'exercise_positions', 'exercises_by_workout', 'workout_types_by_week',
+                     'exercise_ids_by_tag', 'substitutions_by_id'):
+            setattr(self, name, MappingProxyType(getattr(self, name)))
+    
+    def get_facet_values(self, exercise):
+        """Facet values of an exercise, joined with the muscle, equipment and body part tables"""
+        def lookup(table, name_field, name, table_id):
+            # Prefer the exercise's own name; a few records carry stale IDs
+            rows = self.database.get(table, {})
+            for row in rows.values():
+                if row.get(name_field) == name:
+                    return row
+            return rows.get(str(table_id), {})
+        
+        muscle = lookup('muscles', 'muscle_name', exercise.get('muscle'), exercise.get('muscle_id'))
+        equipment = lookup('equipment', 'equipment_name', exercise.get('equipment'), exercise.get('equipment_id'))
+        body_part = lookup('body_parts', 'body_part_name', exercise.get('body_part'), exercise.get('body_part_id'))
+        return {
+            'week': self.normalize_week(exercise.get('week')),
+            'workout_type': exercise.get('workout_type'),
+            'muscle': exercise.get('muscle'),
+            'muscle_group': muscle.get('muscle_group'),
+            'equipment': exercise.get('equipment'),
+            'equipment_category': equipment.get('category'),
+            'mobility': equipment.get('mobility'),
+            'resistance_type': equipment.get('resistance_type'),
+            'body_part': exercise.get('body_part'),
+            'body_part_category': body_part.get('category'),
+            'training_focus': exercise.get('training_focus')
+        }
     
     def get_exercise_by_id(self, exercise_id):
         """Get exercise by ID - returns first match for duplicate IDs"""
-        if isinstance(self.database['exercises'], dict):
-            return self.database['exercises'].get(exercise_id)
-        else:
-            for exercise in self.database['exercises']:
-                if exercise['id'] == exercise_id:
-                    return exercise
-        return None
+        return self.exercises_by_id.get(exercise_id)
     
     def get_all_exercises(self):
         """Get all exercises"""
-        if isinstance(self.database['exercises'], list):
-            return self.database['exercises']
-        elif isinstance(self.database['exercises'], dict):
-            return list(self.database['exercises'].values())
-        return []
+        return self.exercises
     
     def get_exercises_for_workout(self, week, workout_type):
         """Get exercises for a specific week and workout type"""
-        exercises = []
-        all_exercises = self.get_all_exercises()
-        for exercise in all_exercises:
-            if exercise.get('week') == week and exercise.get('workout_type') == workout_type:
-                exercises.append(exercise)
-        return exercises
+        return list(self.exercises_by_workout.get((self.normalize_week(week), workout_type), ()))
+    
+    def get_exercises_with_tags(self, tags, exercises=None):
+        """Exercises (from exercises, default all) carrying every one of tags, in catalog order"""
+        pool = self.exercises if exercises is None else exercises
+        matches = None
+        for tag in tags:
+            ids = self.exercise_ids_by_tag.get(tag, frozenset())
+            matches = ids if matches is None else matches & ids
+        if matches is None:
+            return list(pool)
+        return [exercise for exercise in pool if exercise['id'] in matches]
+    
+    def get_exercises_in_ranges(self, bounds, exercises=None):
+        """
+        Exercises (from exercises, default all) whose prescription lies within every (field, bound, value):
+        ('rest_seconds', 'max', 120) keeps rest of at most 2 min, ('reps', 'min', 10) at least 10 reps
+        """
+        pool = self.exercises if exercises is None else exercises
+        matches = []
+        for exercise in pool:
+            prescription = exercise['prescription']
+            for field, bound, value in bounds:
+                parsed = prescription.get(field)
+                if parsed is None or (parsed['max'] > value if bound == 'max' else parsed['min'] < value):
+                    break
+            else:
+                matches.append(exercise)
+        return matches
     
     def get_workout_types_by_week(self, week):
         """Get available workout types for a specific week"""
-        workout_types = set()
-        all_exercises = self.get_all_exercises()
-        for exercise in all_exercises:
-            if exercise.get('week') == week:
-                workout_types.add(exercise.get('workout_type'))
-        return sorted(list(workout_types))
+        return list(self.workout_types_by_week.get(self.normalize_week(week), ()))
     
     def get_equipment_categories(self):
         """Get all equipment categories for filtering"""
@@ -110,7 +668,7 @@ class UltimateWorkoutDatabase:
             if equipment['category'] == category:
                 equipment_list.append({
                     'id': eq_id,
-                    'name': equipment['name'],
+                    'name': equipment['equipment_name'],
                     'subcategory': equipment['subcategory'],
                     'mobility': equipment['mobility'],
                     'resistance_type': equipment['resistance_type']
@@ -131,26 +689,42 @@ class UltimateWorkoutDatabase:
         if substitution_exercise_id == original_exercise_id:
             return original_exercise
         
-        # Look for the substitution in the original exercise's substitutions
-        for sub in original_exercise.get('substitutions', []):
-            if isinstance(sub, dict) and sub.get('id') == substitution_exercise_id:
-                # Return the substitution exercise data
-                return {
-                    'id': sub['id'],
-                    'name': sub['name'],
-                    'muscle': sub['muscle'],
-                    'equipment': sub['equipment'],
-                    'body_part': sub['body_part'],
-                    'week': original_exercise['week'],
-                    'workout_type': original_exercise['workout_type'],
-                    'working_sets': original_exercise['working_sets'],
-                    'reps': original_exercise['reps'],
-                    'rest': original_exercise['rest'],
-                    'notes': original_exercise.get('notes', ''),
-                    'substitutions': original_exercise['substitutions']  # Keep substitution options
-                }
+        # Look up the substitution among the original exercise's substitutions
+        sub = self.substitutions_by_id.get((original_exercise_id, substitution_exercise_id))
+        if not sub:
+            return None
         
-        return None
+        # Return the substitution exercise data as a new record; the shared catalog is never modified
+        return ExerciseRecord({
+            'id': sub['id'],
+            'name': sub['name'],
+            'muscle': sub['muscle'],
+            'equipment': sub['equipment'],
+            'body_part': sub['body_part'],
+            'week': original_exercise['week'],
+            'workout_type': original_exercise['workout_type'],
+            'working_sets': original_exercise['working_sets'],
+            'reps': original_exercise['reps'],
+            'rest': original_exercise['rest'],
+            'notes': original_exercise.get('notes', ''),
+            'substitutions': original_exercise['substitutions'],  # Keep substitution options
+            'prescription': original_exercise['prescription']
+        })
+    
+    def substitute_exercises(self, substitutions):
+        """
+        Resolve many substitutions at once from a map of original_id -> substitution_id.
+        Returns (resolved exercises keyed by original_id, original_ids that could not be resolved)
+        """
+        resolved = {}
+        missing = []
+        for original_id, substitution_id in substitutions.items():
+            exercise = self.substitute_exercise(original_id, substitution_id)
+            if exercise:
+                resolved[original_id] = exercise
+            else:
+                missing.append(original_id)
+        return resolved, missing
     
     def get_smart_substitutions(self, exercise_id):
         """
@@ -166,7 +740,7 @@ class UltimateWorkoutDatabase:
         # Return substitutions directly since they're already in the correct format
         enhanced_substitutions = []
         for sub_obj in original_substitutions:
-            if isinstance(sub_obj, dict):
+            if isinstance(sub_obj, Mapping):
                 enhanced_sub = {
                     'id': sub_obj.get('id', ''),
                     'name': sub_obj.get('name', ''),
@@ -179,8 +753,9 @@ class UltimateWorkoutDatabase:
         
         return enhanced_substitutions
     
-    def generate_comprehensive_tags(self, exercise):
-        """Generate comprehensive tags including equipment categories"""
+    @staticmethod
+    def generate_comprehensive_tags(exercise):
+        """Generate comprehensive tags including movement patterns, as an interned tuple"""
         tags = []
         
         # Muscle tags
@@ -220,28 +795,446 @@ class UltimateWorkoutDatabase:
         if any(word in exercise_name for word in ['raise', 'lateral', 'fly', 'flye']):
             tags.append('raising')
         
-        return list(set(tags))  # Remove duplicates
+        # Remove duplicates, keeping order; interning shares one string per tag across the catalog
+        return tuple(dict.fromkeys(sys.intern(tag) for tag in tags))
 
 # Initialize database
-db = UltimateWorkoutDatabase()
+_catalog = UltimateWorkoutDatabase()
 
-def build_enhanced_workout_templates():
-    """Build workout templates with enhanced equipment information"""
-    templates = {}
+def current_catalog():
+    """The catalog pinned to the current request, or the live one outside a request"""
+    if not has_app_context():
+        return _catalog
+    catalog = g.get('catalog')
+    if catalog is None:
+        catalog = g.catalog = _catalog
+    return catalog
+
+# Requests keep using the catalog they started with, even if a reload swaps it mid-request
+db = LocalProxy(current_catalog)
+
+# Bodies smaller than this are not worth compressing
+COMPRESS_MIN_SIZE = 1024
+# Content codings we can produce, preferred first
+CONTENT_CODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def compress(body, coding, cached=False):
+    """
+    body compressed with one of CONTENT_CODINGS. Cached bodies are compressed once per
+    catalog version, so they get the denser settings.
+    """
+    if coding == 'br':
+        return brotli.compress(body, quality=9 if cached else 4)
+    return gzip.compress(body, 9 if cached else 6, mtime=0)
+
+def compress_body(body, cached=False):
+    """Every compressed variant of body as {content coding: bytes}, brotli first when available"""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return {}
+    return {coding: compress(body, coding, cached) for coding in CONTENT_CODINGS}
+
+def negotiate_encoding(codings):
+    """The client's preferred content coding among codings (ties go to the first), or None for identity"""
+    best, best_quality = None, 0
+    for coding in codings:
+        quality = request.accept_encodings[coding]
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def encoded_response(response, body, encoded):
+    """Fill response with body, or the variant in encoded that the client prefers"""
+    if encoded:
+        response.vary.add('Accept-Encoding')
+        coding = negotiate_encoding(encoded)
+        if coding is not None:
+            response.set_data(encoded[coding])
+            response.headers['Content-Encoding'] = coding
+            return response
+    response.set_data(body)
+    return response
+
+class CatalogBlob:
+    """
+    Precompiled catalog responses in one file that every worker maps read-only, so the
+    encoded bodies sit once in the page cache instead of once per worker.
+    Serving one still copies its body out of the mapping for that response (about 350 KB for
+    /api/exercises), since WSGI servers such as gunicorn only write bytes objects; the copy is
+    freed with the response, so it is per request, not per worker.
+    Layout: MAGIC, 4-byte big-endian index length, JSON offset index, then the bodies.
+    """
+    
+    MAGIC = b'WCATBLOB2\n'
+    
+    def __init__(self, mapping, version, offsets):
+        self._map = mapping
+        self.version = version
+        self._offsets = offsets
+    
+    @classmethod
+    def write(cls, path, version, entries):
+        """Write {cache key: (body, {coding: bytes})} atomically, so workers never map a partial file"""
+        index = []
+        chunks = []
+        offset = 0
+        for key, (body, encoded) in entries.items():
+            locations = []
+            for data in (body, *encoded.values()):
+                locations.append([offset, len(data)])
+                chunks.append(data)
+                offset += len(data)
+            index.append([list(key), locations[0], dict(zip(encoded, locations[1:]))])
+        header = {'version': version, 'format': CATALOG_SNAPSHOT_FORMAT, 'codings': CONTENT_CODINGS, 'entries': index}
+        header = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        atomic_write(path, [cls.MAGIC, len(header).to_bytes(4, 'big'), header, *chunks])
+    
+    @classmethod
+    def open(cls, path, version):
+        """Map a compiled file read-only; None if it is missing, damaged or for another catalog version"""
+        try:
+            with open(path, 'rb') as f:
+                mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            start = len(cls.MAGIC) + 4
+            if mapping[:len(cls.MAGIC)] != cls.MAGIC:
+                raise ValueError('not a catalog blob')
+            length = int.from_bytes(mapping[len(cls.MAGIC):start], 'big')
+            header = json.loads(mapping[start:start + length])
+            # Also stale when compiled from other record shapes or codings (brotli installed or removed since)
+            if header.get('version') != version or header.get('format') != CATALOG_SNAPSHOT_FORMAT \
+                    or header.get('codings') != list(CONTENT_CODINGS):
+                mapping.close()
+                return None
+            base = start + length
+            offsets = {}
+            for key, (offset, body_length), encoded in header['entries']:
+                offsets[cls.cache_key(key)] = (
+                    (base + offset, body_length),
+                    {coding: (base + offset, length) for coding, (offset, length) in encoded.items()}
+                )
+        except Exception as e:
+            # A damaged blob is recompiled; it must never stop the app from starting
+            mapping.close()
+            app.logger.warning("⚠️ Ignoring unreadable catalog blob %s: %s", path, e)
+            return None
+        return cls(mapping, version, offsets)
+    
+    @classmethod
+    def cache_key(cls, value):
+        """Turn a key read back from JSON into the tuple it was written from (lists -> tuples, nested too)"""
+        return tuple(cls.cache_key(item) for item in value) if isinstance(value, list) else value
+    
+    def get(self, key):
+        """(body, {coding: bytes}) copied out of the mapping for one response, or None if key was not precompiled"""
+        location = self._offsets.get(key)
+        if location is None:
+            return None
+        (start, length), encoded = location
+        return self._map[start:start + length], {
+            coding: self._map[start:start + length] for coding, (start, length) in encoded.items()
+        }
+
+# Encoded bytes a worker keeps in its ResponseCache; least recently used bodies are dropped beyond it
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+class ResponseCache:
+    """Encoded JSON bodies for read-only catalog endpoints, keyed by endpoint and arguments (LRU, bounded in bytes)"""
+    
+    def __init__(self, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+        # CatalogBlob of precompiled bodies shared by all workers, checked before building locally
+        self.shared = None
+    
+    @staticmethod
+    def entry_size(entry):
+        body, encoded = entry
+        return len(body) + sum(len(data) for data in encoded.values())
+    
+    def get_or_build(self, key, build):
+        """
+        Return (body, {coding: compressed body}) for key, encoding build() on the first miss.
+        The compressed variants are empty for bodies too small to be worth compressing.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        shared = self.shared
+        if shared is not None:
+            entry = shared.get(key)
+            if entry is not None:
+                return entry
+        body = jsonify(build()).get_data()
+        entry = (body, compress_body(body, cached=True))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= self.entry_size(previous)
+            self._entries[key] = entry
+            self._size += self.entry_size(entry)
+            while self._size > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= self.entry_size(evicted)
+        return entry
+    
+    def take(self, version):
+        """Remove and return the entries built for one catalog version"""
+        with self._lock:
+            taken = {key: entry for key, entry in self._entries.items() if key[0] == version}
+            for key, entry in taken.items():
+                del self._entries[key]
+                self._size -= self.entry_size(entry)
+        return taken
+    
+    def clear(self):
+        """Drop every cached body (the catalog changed)"""
+        with self._lock:
+            self._entries = OrderedDict()
+            self._size = 0
+
+response_cache = ResponseCache()
+
+def cached_json_response(key, build):
+    """Serve a catalog response from the cache, building it once per catalog load"""
+    # Versioned keys, so a request that began before a reload never caches stale data under the new catalog
+    body, encoded = response_cache.get_or_build((db.version,) + key, build)
+    return encoded_response(app.response_class(mimetype=app.json.mimetype), body, encoded)
+
+@app.after_request
+def compress_response(response):
+    """
+    Compress dynamic JSON responses in the one coding the client prefers. Cached catalog
+    responses were already negotiated (they carry Vary: Accept-Encoding) and are left alone.
+    """
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers or 'Accept-Encoding' in response.vary
+            or response.mimetype != app.json.mimetype):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    response.vary.add('Accept-Encoding')
+    coding = negotiate_encoding(CONTENT_CODINGS)
+    if coding is not None:
+        response.set_data(compress(body, coding))
+        response.headers['Content-Encoding'] = coding
+    return response
+
+# Catalog responses are revalidated on every use (a reload can change them at any time), which
+# costs an empty 304 when nothing changed; endpoints without a login may also sit in shared caches briefly
+CATALOG_PRIVATE_CACHE_CONTROL = 'private, no-cache'
+CATALOG_PUBLIC_CACHE_CONTROL = 'public, max-age=60'
+
+def catalog_endpoint(public=False):
+    """
+    Conditional GET support for read-only catalog endpoints. Their responses depend only on
+    the catalog version and the URL, so the validator is derived from both and a request
+    whose cached copy is still current gets a 304 before the view runs.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Weak, since gzip and identity bodies share it
+            etag = hashlib.sha256(f'{db.version} {request.full_path}'.encode('utf-8')).hexdigest()[:16]
+            if is_resource_modified(request.environ, etag=f'W/"{etag}"', last_modified=db.modified):
+                response = app.make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.last_modified = db.modified
+            response.headers['Cache-Control'] = CATALOG_PUBLIC_CACHE_CONTROL if public else CATALOG_PRIVATE_CACHE_CONTROL
+            return response
+        return decorated_function
+    return decorator
+
+# Seconds between checks of workout_database.json for edits; 0 turns hot reload off
+CATALOG_RELOAD_INTERVAL = float(os.environ.get('WORKOUT_CATALOG_RELOAD_INTERVAL', '5'))
+_catalog_lock = threading.Lock()
+_catalog_watcher_pid = None
+
+# Compiled catalog responses mapped by every worker; unset (local development) keeps them in memory
+CATALOG_BLOB_PATH = os.environ.get('WORKOUT_CATALOG_BLOB', '')
+
+def precompile_catalog_responses(catalog):
+    """Encode a catalog's hot responses through their routes; returns {cache key: (body, {coding: bytes})}"""
+    urls = [DATABASE_PAGE_EXERCISES_URL, '/api/exercises', PROGRAM_URL, '/api/program', '/api/equipment-categories']
+    urls += [f'/api/workout-types/{week}' for week in catalog.weeks if isinstance(week, int)]
+    urls += ['/api/exercises?' + urlencode({'week': week, 'workout_type': workout_type})
+             for week, workout_type in catalog.exercises_by_workout if workout_type]
+    urls += [f"/api/exercises/{quote(exercise_id, safe='')}" for exercise_id in catalog.exercises_by_id]
+    for url in urls:
+        # Views are called directly: no before_request hooks (and so no watcher thread) in a preloading master
+        with app.test_request_context(url):
+            g.catalog = catalog
+            session['logged_in'] = True
+            app.view_functions[request.endpoint](**request.view_args)
+    return response_cache.take(catalog.version)
+
+def share_catalog_responses(catalog):
+    """Map the catalog's compiled responses for all workers to share, compiling them first if needed"""
+    if not CATALOG_BLOB_PATH:
+        return
+    blob = CatalogBlob.open(CATALOG_BLOB_PATH, catalog.version)
+    if blob is None:
+        try:
+            CatalogBlob.write(CATALOG_BLOB_PATH, catalog.version, precompile_catalog_responses(catalog))
+        except OSError as e:
+            app.logger.warning("⚠️ Could not write catalog blob %s: %s", CATALOG_BLOB_PATH, e)
+            return
+        blob = CatalogBlob.open(CATALOG_BLOB_PATH, catalog.version)
+    response_cache.shared = blob
+
+# Per-exercise fingerprints of recent catalog versions, for /api/catalog/changes
+CATALOG_LOG_PATH = os.environ.get('WORKOUT_CATALOG_LOG', 'workout_database.versions.json')
+CATALOG_LOG_SIZE = 20
+
+def record_catalog_version(catalog):
+    """
+    Add the catalog to the version log and return the log as {version: {exercise_id: row hash}},
+    oldest first. The log lives next to the JSON so restarted and new workers keep the history.
+    """
+    rows = {}
+    for row in build_program_rows(catalog):
+        encoded = app.json.dumps(row, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        rows[row['id']] = hashlib.sha256(encoded).hexdigest()[:16]
     
-    # Get all unique weeks
-    weeks = set()
-    for exercise in db.database['exercises']:
-        weeks.add(exercise['week'])
+    log = {}
+    if CATALOG_LOG_PATH:
+        try:
+            with open(CATALOG_LOG_PATH, 'r') as f:
+                log = {entry['version']: entry['rows'] for entry in json.load(f)['versions']}
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            app.logger.warning("⚠️ Starting a new catalog version log, %s is unreadable: %s", CATALOG_LOG_PATH, e)
+    if log.get(catalog.version) == rows:
+        return log
     
-    for week in sorted(weeks, key=lambda x: (isinstance(x, str), x)):
+    log.pop(catalog.version, None)
+    log[catalog.version] = rows
+    log = dict(list(log.items())[-CATALOG_LOG_SIZE:])
+    if CATALOG_LOG_PATH:
+        versions = [{'version': version, 'rows': entry} for version, entry in log.items()]
+        try:
+            atomic_write(CATALOG_LOG_PATH, json.dumps({'versions': versions}).encode('utf-8'))
+        except OSError as e:
+            app.logger.warning("⚠️ Could not write catalog version log %s: %s", CATALOG_LOG_PATH, e)
+    return log
+
+def prepare_catalog(catalog):
+    """Work done once per catalog version before it goes live"""
+    catalog.version_log = record_catalog_version(catalog)
+    share_catalog_responses(catalog)
+
+def reload_catalog(catalog=None):
+    """Swap in a new catalog (by default reloaded from disk) and invalidate every cached catalog response"""
+    global _catalog
+    if catalog is None:
+        catalog = UltimateWorkoutDatabase()
+    prepare_catalog(catalog)
+    with _catalog_lock:
+        _catalog = catalog
+        response_cache.clear()
+    return catalog
+
+def refresh_catalog():
+    """Reload the catalog now if workout_database.json changed since it was loaded; returns the reloaded catalog or None"""
+    with open(CATALOG_PATH, 'rb') as f:
+        version = UltimateWorkoutDatabase.content_version(f.read())
+    if version == _catalog.version:
+        return None
+    catalog = reload_catalog(UltimateWorkoutDatabase())
+    app.logger.info("🔄 Reloaded workout catalog %s", catalog.version)
+    return catalog
+
+def watch_catalog(interval):
+    """Poll workout_database.json and hot-swap the catalog whenever its content changes"""
+    last_stat = None
+    while True:
+        try:
+            stat = os.stat(CATALOG_PATH)
+            stat = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            stat = None
+        if stat is not None and stat != last_stat:
+            last_stat = stat
+            try:
+                # Built here, off the request path; requests keep the old catalog until the swap
+                refresh_catalog()
+            except Exception as e:
+                # Most likely a half-written file; finishing the write changes its stat again
+                app.logger.warning("⚠️ Keeping workout catalog %s, reload failed: %s", _catalog.version, e)
+        time.sleep(interval)
+
+def start_catalog_watcher():
+    """Start the reload thread once per process; forked workers each need their own"""
+    global _catalog_watcher_pid
+    if CATALOG_RELOAD_INTERVAL <= 0 or _catalog_watcher_pid == os.getpid():
+        return
+    with _catalog_lock:
+        if _catalog_watcher_pid == os.getpid():
+            return
+        _catalog_watcher_pid = os.getpid()
+        threading.Thread(target=watch_catalog, args=(CATALOG_RELOAD_INTERVAL,),
+                         name='catalog-watcher', daemon=True).start()
+
+@app.before_request
+def pin_catalog():
+    start_catalog_watcher()
+    g.catalog = _catalog
+
+def measure_catalog_memory(path='workout_database.json'):
+    """Traced bytes held by the exercises as parsed JSON dicts vs. as compact records"""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        exercises = json.loads(raw)['exercises']
+        as_dicts = tracemalloc.get_traced_memory()[0] - baseline
+        records = tuple(
+            ExerciseRecord(dict(exercise, tags=UltimateWorkoutDatabase.generate_comprehensive_tags(exercise)))
+            for exercise in exercises
+        )
+        del exercises
+        as_records = tracemalloc.get_traced_memory()[0] - baseline
+    finally:
+        if started:
+            tracemalloc.stop()
+    return {'exercises': len(records), 'dict_bytes': as_dicts, 'record_bytes': as_records}
+
+@app.cli.command('catalog-memory')
+def catalog_memory_command():
+    """Report how much memory the exercise catalog takes per worker"""
+    report = measure_catalog_memory()
+    print(f"📏 Exercise catalog memory ({report['exercises']} exercises):")
+    print(f"   • JSON dicts: {report['dict_bytes'] / 1024:.1f} KiB")
+    print(f"   • Compact records: {report['record_bytes'] / 1024:.1f} KiB")
+
+def build_enhanced_workout_templates(catalog=None):
+    """Build workout templates with enhanced equipment information (for catalog, default the request's)"""
+    if catalog is None:
+        catalog = db
+    templates = {}
+    
+    for week in catalog.weeks:
         templates[str(week)] = {'days': {}}
         
         # Get workout types for this week
-        workout_types = db.get_workout_types_by_week(week)
+        workout_types = catalog.get_workout_types_by_week(week)
         
         for workout_type in workout_types:
-            exercises = db.get_exercises_for_workout(week, workout_type)
+            exercises = catalog.get_exercises_for_workout(week, workout_type)
             
             if exercises:
                 # Convert to the format expected by the frontend
@@ -262,7 +1255,8 @@ def build_enhanced_workout_templates():
                         'rest': exercise['rest'],
                         'notes': exercise.get('notes', ''),
                         'tutorial_url': exercise.get('tutorial_url', ''),
-                        'substitutions': exercise.get('substitutions', [])
+                        'substitutions': exercise.get('substitutions', []),
+                        'prescription': exercise['prescription']
                     }
                     formatted_exercises.append(formatted_exercise)
                 
@@ -272,59 +1266,329 @@ def build_enhanced_workout_templates():
     
     return templates
 
-# Build enhanced workout templates
-# workout_templates = build_enhanced_workout_templates()
+def build_program_rows(catalog=None):
+    """The program as one flat exercise list, each exercise with its week and workout_type"""
+    rows = []
+    for week, week_data in build_enhanced_workout_templates(catalog).items():
+        for workout_type, day in week_data['days'].items():
+            for exercise in day['exercises']:
+                rows.append(dict(exercise, week=int(week) if week.isdigit() else week, workout_type=workout_type))
+    return rows
 
-def generate_comprehensive_tags(exercise):
-    """Generate comprehensive tags for an exercise"""
-    tags = []
-    
-    # Add muscle tag
-    if exercise.get('muscle'):
-        tags.append(exercise['muscle'])
+# Enhanced workout templates are served (and cached) by /api/program
+
+# Fields holding lists of nested objects, which the compact format keeps in their own table
+COMPACT_RECORD_FIELDS = ('substitutions', 'substitution_details')
+
+def encode_compact(rows):
+    """
+    Dictionary-encode a list of exercise objects for ?format=compact. Every repeated value is
+    stored once in `strings`, and each field becomes a column of indexes into it: -1 where a row
+    lacks the field, a list of indexes for list values. Columns whose values are all distinct
+    (IDs) are listed in `plain` and hold the values themselves. Substitution objects are encoded
+    the same way in `records`; a row's substitutions column holds how many of the next records are its own.
+    """
+    values = {}
+    records = []
     
-    # Add equipment tag
-    if exercise.get('equipment'):
-        tags.append(exercise['equipment'])
+    def code(value):
+        # Keyed by type too, so 1 and True (or 1.0) keep separate entries; objects by their JSON
+        key = app.json.dumps(value, sort_keys=True) if isinstance(value, Mapping) else value
+        return values.setdefault((type(value), key), (len(values), value))[0]
     
-    # Add body part tag
-    if exercise.get('body_part'):
-        tags.append(exercise['body_part'])
+    def encode_rows(rows, record_fields):
+        fields = list(dict.fromkeys(field for row in rows for field in row))
+        columns = []
+        plain = []
+        for field in fields:
+            cells = [row.get(field) for row in rows]
+            if field in record_fields:
+                column = []
+                for row, items in zip(rows, cells):
+                    if field not in row:
+                        column.append(-1)
+                    else:
+                        records.extend(items)
+                        column.append(len(items))
+            elif (all(field in row for row in rows) and not any(isinstance(cell, (list, tuple, Mapping)) for cell in cells)
+                    and len(set(cells)) == len(cells)):
+                plain.append(field)
+                column = cells
+            else:
+                column = [
+                    -1 if field not in row
+                    else [code(item) for item in cell] if isinstance(cell, (list, tuple))
+                    else code(cell)
+                    for row, cell in zip(rows, cells)
+                ]
+            columns.append(column)
+        return {'fields': fields, 'columns': columns, 'plain': plain, 'count': len(rows)}
     
-    return tags
+    table = encode_rows(rows, COMPACT_RECORD_FIELDS)
+    table['records'] = encode_rows(records, ())
+    table['record_fields'] = list(COMPACT_RECORD_FIELDS)
+    table['strings'] = [value for _, value in values.values()]
+    table['format'] = 'compact'
+    return table
+
+def response_format():
+    """The ?format= a catalog list was asked for: 'json' (default) or 'compact'; None if unknown"""
+    requested = request.args.get('format', 'json')
+    return requested if requested in ('json', 'compact') else None
+
+# The program as the page preloads it for offline use (keep in sync with preCacheWorkoutData)
+PROGRAM_URL = '/api/program?format=compact'
+# Largest page ?limit= may ask for
+EXERCISE_PAGE_MAX = 500
+# ?<field>_min= / ?<field>_max= bounds on the parsed prescription, e.g. ?rest_seconds_max=120
+PRESCRIPTION_BOUNDS = {
+    f'{field}_{bound}': (field, bound) for field in PrescriptionRecord.FIELDS for bound in ('min', 'max')
+}
+# Exercise Database page list: one exercise per name, only the fields its cards show
+DATABASE_PAGE_EXERCISES_URL = ('/api/exercises?unique=1&fields=id,name,muscle,equipment,'
+                               'reps,warmup_sets,working_sets,rest,notes,tutorial_url')
 
 @app.route('/api/exercises')
 @login_required
+@catalog_endpoint()
 def get_exercises():
-    """API endpoint to get exercises filtered by week and workout_type or all exercises"""
+    """
+    API endpoint to get exercises filtered by week and workout_type or all exercises, optionally by ?tag=.
+    ?fields=name,muscle keeps only those fields and ?unique=1 one exercise per name.
+    ?limit= pages through the results; the next page (?after=<last exercise id>) is in the Link header.
+    ?rest_seconds_max=120, ?reps_min=10... keep exercises whose parsed prescription lies within the bounds.
+    ?ids=EX001,EX014 instead returns {exercises, missing} for those IDs, in request order.
+    ?format=compact returns the exercises dictionary-encoded (see encode_compact).
+    """
+    requested = response_format()
+    if requested is None:
+        return jsonify({'error': 'format must be json or compact'}), 400
+    compact = requested == 'compact'
     week = request.args.get('week')
     workout_type = request.args.get('workout_type')
+    tags = tuple(sorted(set(request.args.getlist('tag'))))
+    unique_names = request.args.get('unique', '0') != '0'
+    after = request.args.get('after')
+    limit = request.args.get('limit', type=int)
+    if 'limit' in request.args and limit is None:
+        return jsonify({'error': 'limit must be a number'}), 400
+    if limit is not None:
+        limit = min(max(limit, 1), EXERCISE_PAGE_MAX)
+    fields = request.args.get('fields')
+    if fields is not None:
+        fields = {field.strip() for field in fields.split(',') if field.strip()}
+        unknown = sorted(fields - ExerciseRecord.FIELD_SET)
+        if unknown or not fields:
+            return jsonify({'error': f"Unknown fields: {', '.join(unknown) or '(none given)'}"}), 400
+        # Catalog field order, so every spelling of one projection shares a cache entry
+        fields = tuple(field for field in ExerciseRecord.FIELDS if field in fields)
+    if after is not None and after not in db.exercise_positions:
+        return jsonify({'error': f'Unknown cursor: {after}'}), 400
+    bounds = []
+    for arg, (field, bound) in PRESCRIPTION_BOUNDS.items():
+        if arg in request.args:
+            value = request.args.get(arg, type=float)
+            if value is None:
+                return jsonify({'error': f'{arg} must be a number'}), 400
+            bounds.append((field, bound, value))
+    bounds = tuple(bounds)
+    
+    def project(exercise):
+        if fields is None:
+            return exercise
+        return {field: exercise[field] for field in fields if field in exercise}
+    
+    ids = request.args.get('ids')
+    if ids is not None:
+        if week or workout_type or tags or bounds or unique_names or after is not None or limit is not None:
+            return jsonify({'error': 'ids cannot be combined with filters or paging'}), 400
+        ids = list(dict.fromkeys(exercise_id.strip() for exercise_id in ids.split(',') if exercise_id.strip()))
+        if len(ids) > EXERCISE_PAGE_MAX:
+            return jsonify({'error': f'At most {EXERCISE_PAGE_MAX} ids per request'}), 400
+        found = [db.get_exercise_by_id(exercise_id) for exercise_id in ids]
+        exercises = [project(exercise) for exercise in found if exercise is not None]
+        return jsonify({
+            'exercises': encode_compact(exercises) if compact else exercises,
+            'missing': [exercise_id for exercise_id, exercise in zip(ids, found) if exercise is None]
+        })
+    
+    # Nothing can match; still answered in the requested format
+    empty = encode_compact([]) if compact else []
+    if any(tag not in db.exercise_ids_by_tag for tag in tags):
+        return jsonify(empty)
     
     if week and workout_type:
-        # Filter exercises by week and workout_type
-        exercises = db.get_exercises_for_workout(int(week), workout_type)
+        key = (db.normalize_week(week), workout_type)
+        if key not in db.exercises_by_workout:
+            return jsonify(empty)
+        cache_key = ('exercises',) + key + tags
     else:
-        # Return all exercises (for Exercise Database)
-        exercises = db.get_all_exercises()
+        cache_key = ('exercises',) + tags
+    
+    def select():
+        if week and workout_type:
+            # Filter exercises by week and workout_type
+            exercises = db.get_exercises_for_workout(week, workout_type)
+        else:
+            # Return all exercises (for Exercise Database)
+            exercises = db.get_all_exercises()
+        if tags:
+            exercises = db.get_exercises_with_tags(tags, exercises)
+        if bounds:
+            exercises = db.get_exercises_in_ranges(bounds, exercises)
+        if unique_names:
+            seen_names = set()
+            exercises = [exercise for exercise in exercises
+                         if exercise['name'] not in seen_names and not seen_names.add(exercise['name'])]
+        if after is not None:
+            # Keyset cursor: results come in catalog order, so resume right after that exercise
+            position = db.exercise_positions[after]
+            exercises = [exercise for exercise in exercises if db.exercise_positions[exercise['id']] > position]
+        return exercises
     
-    # Add comprehensive tags for each exercise
-    for exercise in exercises:
-        exercise['tags'] = generate_comprehensive_tags(exercise)
+    # Pages and range filters are encoded per request (compressed by compress_response):
+    # their cursors and client-chosen numbers must not be able to fill the cache
+    cached = after is None and limit is None and not bounds
+    if cached and fields is None and not unique_names and not compact:
+        return cached_json_response(cache_key, select)
     
-    return jsonify(exercises)
+    exercises = select()
+    page = exercises if limit is None else exercises[:limit]
+    
+    def build():
+        rows = [project(exercise) for exercise in page]
+        return encode_compact(rows) if compact else rows
+    
+    if cached:
+        # Every projection and format of a whole list has its own cached encoding
+        return cached_json_response(cache_key + (fields, unique_names, compact), build)
+    
+    response = jsonify(build())
+    if len(page) < len(exercises):
+        args = request.args.to_dict(flat=False)
+        args['after'] = [page[-1]['id']]
+        response.headers['Link'] = f'<{request.path}?{urlencode(args, doseq=True)}>; rel="next"'
+    return response
+
+@app.route('/api/program')
+@login_required
+@catalog_endpoint()
+def get_program():
+    """
+    API endpoint to get the whole program (every week and workout type) in one response.
+    ?format=compact sends it as one dictionary-encoded exercise list with week and workout_type fields.
+    """
+    requested = response_format()
+    if requested is None:
+        return jsonify({'error': 'format must be json or compact'}), 400
+    if requested == 'json':
+        return cached_json_response(('program',), lambda: {
+            'version': db.version,
+            'weeks': build_enhanced_workout_templates()
+        })
+    
+    return cached_json_response(('program', 'compact'), lambda: {
+        'version': db.version,
+        'exercises': encode_compact(build_program_rows())
+    })
+
+@app.route('/api/catalog/changes')
+@login_required
+@catalog_endpoint()
+def get_catalog_changes():
+    """
+    API endpoint for delta sync: program exercises changed or added (`changed`) and removed
+    (`removed`) since catalog version ?since=, plus the new exercise order when it changed.
+    410 when that version has left the version log, so the client downloads the program again.
+    """
+    since = request.args.get('since')
+    if not since:
+        return jsonify({'error': 'since is required'}), 400
+    previous = db.version_log.get(since)
+    if previous is None:
+        return jsonify({'error': f'Unknown or expired catalog version: {since}', 'version': db.version}), 410
+    
+    def build():
+        current = db.version_log[db.version]
+        changes = {
+            'version': db.version,
+            'since': since,
+            'changed': [row for row in build_program_rows() if previous.get(row['id']) != current[row['id']]],
+            'removed': [exercise_id for exercise_id in previous if exercise_id not in current]
+        }
+        if list(previous) != list(current):
+            changes['order'] = list(current)
+        return changes
+    
+    return cached_json_response(('changes', since), build)
+
+@app.route('/api/search')
+@login_required
+@catalog_endpoint()
+def search_exercises():
+    """API endpoint for ranked, typo-tolerant exercise search (?q=, ?page=, ?per_page=, ?unique=0)"""
+    query = request.args.get('q', '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    unique_names = request.args.get('unique', '1') != '0'
+    
+    ranked = db.search_index.search(query, unique_names)
+    start = (page - 1) * per_page
+    return jsonify({
+        'query': query,
+        'total': len(ranked),
+        'page': page,
+        'per_page': per_page,
+        'results': [dict(exercise, score=round(score, 3)) for exercise, score in ranked[start:start + per_page]]
+    })
+
+@app.route('/api/facets')
+@login_required
+@catalog_endpoint()
+def filter_by_facets():
+    """
+    API endpoint for faceted filtering, e.g.
+    ?equipment_category=Cable/Pulley&resistance_type=Constant Tension&muscle_group=Upper Body Push.
+    Repeat a facet to OR its values. Returns the matching page plus counts for every facet value.
+    """
+    unknown = set(request.args) - set(FacetIndex.FACETS) - {'page', 'per_page', 'unique'}
+    if unknown:
+        return jsonify({'error': f"Unknown facets: {', '.join(sorted(unknown))}"}), 400
+    
+    selections = {}
+    for facet in FacetIndex.FACETS:
+        values = request.args.getlist(facet)
+        if values:
+            selections[facet] = [db.normalize_week(value) for value in values] if facet == 'week' else values
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 0), 100)
+    unique_names = request.args.get('unique', '0') != '0'
+    
+    matches, counts = db.facet_index.query(selections, unique_names)
+    members = db.facet_index.members(matches)
+    start = (page - 1) * per_page
+    return jsonify({
+        'total': len(members),
+        'page': page,
+        'per_page': per_page,
+        'results': members[start:start + per_page],
+        'facets': counts
+    })
 
 @app.route('/api/exercises/<exercise_id>')
 @login_required
+@catalog_endpoint()
 def get_exercise_by_id(exercise_id):
     """API endpoint to get a specific exercise by ID"""
     exercise = db.get_exercise_by_id(exercise_id)
     if exercise:
-        return jsonify(exercise)
+        return cached_json_response(('exercise', exercise_id), lambda: exercise)
     else:
         return jsonify({'error': 'Exercise not found'}), 404
 
 @app.route('/api/substitutions/<exercise_id>')
 @login_required
+@catalog_endpoint()
 def get_substitutions(exercise_id):
     """API endpoint to get smart substitutions for an exercise"""
     substitutions = db.get_smart_substitutions(exercise_id)
@@ -347,71 +1611,647 @@ def substitute_exercise():
     else:
         return jsonify({'error': 'Substitution not found'}), 404
 
+@app.route('/api/substitute/batch', methods=['POST'])
+@login_required
+def substitute_exercises():
+    """API endpoint to resolve a map of original_id -> substitution_id in one call"""
+    data = request.get_json(silent=True) or {}
+    substitutions = data.get('substitutions')
+    
+    if not isinstance(substitutions, dict) or not all(
+            isinstance(sub_id, str) for sub_id in substitutions.values()):
+        return jsonify({'error': 'substitutions must map exercise IDs to substitution IDs'}), 400
+    
+    exercises, missing = db.substitute_exercises(substitutions)
+    return jsonify({'exercises': exercises, 'missing': missing})
+
 @app.route('/api/equipment-categories')
+@catalog_endpoint(public=True)
 def get_equipment_categories():
     """API endpoint to get all equipment categories"""
-    categories = db.get_equipment_categories()
-    return jsonify(categories)
+    return cached_json_response(('equipment-categories',), db.get_equipment_categories)
 
 @app.route('/api/equipment/<category>')
+@catalog_endpoint(public=True)
 def get_equipment_by_category(category):
     """API endpoint to get equipment by category"""
     equipment = db.get_equipment_by_category(category)
     return jsonify(equipment)
 
 @app.route('/api/workout-types/<int:week>')
+@catalog_endpoint(public=True)
 def get_workout_types(week):
     """API endpoint to get workout types for a specific week"""
-    workout_types = db.get_workout_types_by_week(week)
+    if week not in db.workout_types_by_week:
+        return jsonify([])
     # Return the full workout type names with focus keywords
-    return jsonify(workout_types)
+    return cached_json_response(('workout-types', week),
+                                lambda: db.get_workout_types_by_week(week))
+
+# Workout history store (SQLite in WAL mode)
+HISTORY_DB_PATH = os.environ.get('WORKOUT_HISTORY_DB', 'workout_history.db')
+DEFAULT_USER_ID = 'default'
+
+class WorkoutHistoryStore:
+    """Persistent workout history: sessions, the exercises done in them and their sets"""
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS workout_sessions (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            week INTEGER NOT NULL,
+            workout_type TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            UNIQUE (user_id, date, week, workout_type)
+        );
+        CREATE TABLE IF NOT EXISTS session_exercises (
+            id INTEGER PRIMARY KEY,
+            session_id INTEGER NOT NULL REFERENCES workout_sessions (id) ON DELETE CASCADE,
+            user_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            exercise_id TEXT NOT NULL,
+            exercise_name TEXT NOT NULL,
+            substitution_id TEXT,
+            position INTEGER NOT NULL,
+            UNIQUE (session_id, exercise_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_session_exercises_user_exercise_date
+            ON session_exercises (user_id, exercise_name, date);
+        CREATE TABLE IF NOT EXISTS exercise_sets (
+            id INTEGER PRIMARY KEY,
+            session_exercise_id INTEGER NOT NULL REFERENCES session_exercises (id) ON DELETE CASCADE,
+            set_number INTEGER NOT NULL,
+            weight REAL,
+            reps INTEGER,
+            rpe REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_exercise_sets_session_exercise
+            ON exercise_sets (session_exercise_id, set_number);
+        CREATE TABLE IF NOT EXISTS exercise_session_stats (
+            session_exercise_id INTEGER PRIMARY KEY REFERENCES session_exercises (id) ON DELETE CASCADE,
+            user_id TEXT NOT NULL,
+            exercise_name TEXT NOT NULL,
+            date TEXT NOT NULL,
+            set_count INTEGER NOT NULL,
+            max_weight REAL NOT NULL,
+            volume REAL NOT NULL,
+            rpe_sum REAL NOT NULL,
+            rpe_count INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_exercise_session_stats_user_exercise_date
+            ON exercise_session_stats (user_id, exercise_name, date);
+        CREATE TABLE IF NOT EXISTS exercise_progress (
+            user_id TEXT NOT NULL,
+            exercise_name TEXT NOT NULL,
+            session_count INTEGER NOT NULL,
+            set_count INTEGER NOT NULL,
+            max_weight REAL NOT NULL,
+            total_volume REAL NOT NULL,
+            rpe_sum REAL NOT NULL,
+            rpe_count INTEGER NOT NULL,
+            last_date TEXT NOT NULL,
+            PRIMARY KEY (user_id, exercise_name)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS user_preferences (
+            user_id TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, key)
+        ) WITHOUT ROWID;
+    """
+    # Bumped whenever derived tables need rebuilding from the raw history
+    SCHEMA_VERSION = 1
+    
+    # Per-session summary of one exercise, computed from its sets
+    SESSION_STATS_SELECT = """
+        SELECT se.id, se.user_id, se.exercise_name, se.date, COUNT(es.id),
+               COALESCE(MAX(es.weight), 0), COALESCE(SUM(es.weight * es.reps), 0),
+               COALESCE(SUM(es.rpe), 0), COUNT(es.rpe)
+        FROM session_exercises se
+        LEFT JOIN exercise_sets es ON es.session_exercise_id = se.id
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        # Use a throwaway connection so no handle is shared across a fork
+        conn = self._connect()
+        try:
+            conn.executescript(self.SCHEMA)
+            if conn.execute('PRAGMA user_version').fetchone()[0] < self.SCHEMA_VERSION:
+                self._rebuild_progress(conn)
+        finally:
+            conn.close()
+    
+    def _rebuild_progress(self, conn):
+        """Recompute the materialized progress tables from the stored sets"""
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM exercise_session_stats')
+            conn.execute('DELETE FROM exercise_progress')
+            conn.execute(f'INSERT INTO exercise_session_stats {self.SESSION_STATS_SELECT} GROUP BY se.id')
+            conn.execute(
+                'INSERT INTO exercise_progress '
+                'SELECT user_id, exercise_name, COUNT(*), SUM(set_count), MAX(max_weight), SUM(volume), '
+                'SUM(rpe_sum), SUM(rpe_count), MAX(date) FROM exercise_session_stats '
+                'GROUP BY user_id, exercise_name')
+            conn.execute(f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+    
+    def _connection(self):
+        """One connection per thread; sqlite3 connections must not be shared between threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """Run a block as one write transaction, rolled back on any error"""
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+    
+    def save_sessions(self, user_id, sessions):
+        """
+        Save normalized sessions in a single transaction and return their IDs.
+        A session is identified by (date, week, workout_type); saving an exercise
+        that is already in that session replaces its sets.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        session_ids = []
+        with self._transaction() as conn:
+            for workout in sessions:
+                key = (user_id, workout['date'], workout['week'], workout['workout_type'])
+                conn.execute(
+                    'INSERT INTO workout_sessions (user_id, date, week, workout_type, created_at, updated_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (user_id, date, week, workout_type) DO UPDATE SET updated_at = excluded.updated_at',
+                    key + (now, now))
+                session_id = conn.execute(
+                    'SELECT id FROM workout_sessions WHERE user_id = ? AND date = ? AND week = ? AND workout_type = ?',
+                    key).fetchone()[0]
+                session_ids.append(session_id)
+                
+                for position, exercise in enumerate(workout['exercises']):
+                    self._remove_session_exercise(conn, session_id, exercise['id'])
+                    session_exercise_id = conn.execute(
+                        'INSERT INTO session_exercises '
+                        '(session_id, user_id, date, exercise_id, exercise_name, substitution_id, position) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (session_id, user_id, workout['date'], exercise['id'], exercise['name'],
+                         exercise['substitution_id'], position)).lastrowid
+                    conn.executemany(
+                        'INSERT INTO exercise_sets (session_exercise_id, set_number, weight, reps, rpe) '
+                        'VALUES (?, ?, ?, ?, ?)',
+                        [(session_exercise_id, number, s['weight'], s['reps'], s['rpe'])
+                         for number, s in enumerate(exercise['sets'], 1)])
+                    self._add_progress(conn, session_exercise_id)
+        return session_ids
+    
+    def _add_progress(self, conn, session_exercise_id):
+        """Summarize a newly saved exercise and fold it into the per-exercise aggregates"""
+        conn.execute(f'INSERT INTO exercise_session_stats {self.SESSION_STATS_SELECT} '
+                     'WHERE se.id = ? GROUP BY se.id', (session_exercise_id,))
+        conn.execute(
+            'INSERT INTO exercise_progress '
+            'SELECT user_id, exercise_name, 1, set_count, max_weight, volume, rpe_sum, rpe_count, date '
+            'FROM exercise_session_stats WHERE session_exercise_id = ? '
+            'ON CONFLICT (user_id, exercise_name) DO UPDATE SET '
+            'session_count = session_count + 1, '
+            'set_count = set_count + excluded.set_count, '
+            'max_weight = MAX(max_weight, excluded.max_weight), '
+            'total_volume = total_volume + excluded.total_volume, '
+            'rpe_sum = rpe_sum + excluded.rpe_sum, '
+            'rpe_count = rpe_count + excluded.rpe_count, '
+            'last_date = MAX(last_date, excluded.last_date)',
+            (session_exercise_id,))
+    
+    def _remove_session_exercise(self, conn, session_id, exercise_id):
+        """Delete a previously saved exercise (and its sets) and take it back out of the aggregates"""
+        old = conn.execute(
+            'SELECT st.* FROM session_exercises se '
+            'JOIN exercise_session_stats st ON st.session_exercise_id = se.id '
+            'WHERE se.session_id = ? AND se.exercise_id = ?', (session_id, exercise_id)).fetchone()
+        conn.execute('DELETE FROM session_exercises WHERE session_id = ? AND exercise_id = ?',
+                     (session_id, exercise_id))
+        if old is None:
+            return
+        
+        key = (old['user_id'], old['exercise_name'])
+        conn.execute(
+            'UPDATE exercise_progress SET session_count = session_count - 1, set_count = set_count - ?, '
+            'total_volume = total_volume - ?, rpe_sum = rpe_sum - ?, rpe_count = rpe_count - ? '
+            'WHERE user_id = ? AND exercise_name = ?',
+            (old['set_count'], old['volume'], old['rpe_sum'], old['rpe_count']) + key)
+        # Maxima cannot be decremented; recompute them from this exercise's session summaries
+        conn.execute(
+            'UPDATE exercise_progress SET '
+            'max_weight = (SELECT COALESCE(MAX(max_weight), 0) FROM exercise_session_stats '
+            '              WHERE user_id = ? AND exercise_name = ?), '
+            'last_date = (SELECT COALESCE(MAX(date), \'\') FROM exercise_session_stats '
+            '             WHERE user_id = ? AND exercise_name = ?) '
+            'WHERE user_id = ? AND exercise_name = ?', key * 3)
+        conn.execute('DELETE FROM exercise_progress WHERE user_id = ? AND exercise_name = ? AND session_count <= 0',
+                     key)
+    
+    def get_progress(self, user_id, exercise_name, limit=50):
+        """Aggregates for one exercise plus its most recent per-session summaries"""
+        conn = self._connection()
+        totals = conn.execute('SELECT * FROM exercise_progress WHERE user_id = ? AND exercise_name = ?',
+                              (user_id, exercise_name)).fetchone()
+        sessions = [
+            {
+                'date': row['date'],
+                'week': row['week'],
+                'workout_type': row['workout_type'],
+                'sets': row['set_count'],
+                'max_weight': row['max_weight'],
+                'volume': row['volume'],
+                'avg_rpe': round(row['rpe_sum'] / row['rpe_count'], 1) if row['rpe_count'] else 0
+            }
+            for row in conn.execute(
+                'SELECT st.*, s.week, s.workout_type FROM exercise_session_stats st '
+                'JOIN session_exercises se ON se.id = st.session_exercise_id '
+                'JOIN workout_sessions s ON s.id = se.session_id '
+                'WHERE st.user_id = ? AND st.exercise_name = ? '
+                'ORDER BY st.date DESC, st.session_exercise_id DESC LIMIT ?',
+                (user_id, exercise_name, limit))
+        ]
+        return {
+            'exercise': exercise_name,
+            'sessions': sessions,
+            'session_count': totals['session_count'] if totals else 0,
+            'set_count': totals['set_count'] if totals else 0,
+            'max_weight': totals['max_weight'] if totals else 0,
+            'total_volume': totals['total_volume'] if totals else 0,
+            'avg_rpe': round(totals['rpe_sum'] / totals['rpe_count'], 1) if totals and totals['rpe_count'] else 0,
+            'last_date': totals['last_date'] if totals else None
+        }
+    
+    def get_sessions(self, user_id, limit=50, before=None):
+        """Most recent sessions first, with their exercises and sets"""
+        conn = self._connection()
+        query = 'SELECT id, date, week, workout_type FROM workout_sessions WHERE user_id = ?'
+        params = [user_id]
+        if before:
+            query += ' AND date < ?'
+            params.append(before)
+        query += ' ORDER BY date DESC, id DESC LIMIT ?'
+        params.append(limit)
+        sessions = [dict(row, exercises=[]) for row in conn.execute(query, params)]
+        if not sessions:
+            return []
+        
+        by_id = {workout['id']: workout for workout in sessions}
+        placeholders = ', '.join('?' * len(by_id))
+        exercises = {}
+        for row in conn.execute(
+                'SELECT id, session_id, exercise_id, exercise_name, substitution_id FROM session_exercises '
+                f'WHERE session_id IN ({placeholders}) ORDER BY session_id, position', list(by_id)):
+            exercise = exercises[row['id']] = {
+                'id': row['exercise_id'],
+                'name': row['exercise_name'],
+                'substitution_id': row['substitution_id'],
+                'sets': []
+            }
+            by_id[row['session_id']]['exercises'].append(exercise)
+        self._attach_sets(conn, exercises)
+        return sessions
+    
+    def get_exercise_history(self, user_id, exercise_name, limit=50, before=None):
+        """Most recent entries for one exercise, served from the (user, exercise, date) index"""
+        conn = self._connection()
+        query = ('SELECT se.id, se.date, se.exercise_id, se.exercise_name, se.substitution_id, '
+                 's.week, s.workout_type FROM session_exercises se '
+                 'JOIN workout_sessions s ON s.id = se.session_id '
+                 'WHERE se.user_id = ? AND se.exercise_name = ?')
+        params = [user_id, exercise_name]
+        if before:
+            query += ' AND se.date < ?'
+            params.append(before)
+        query += ' ORDER BY se.date DESC, se.id DESC LIMIT ?'
+        params.append(limit)
+        
+        entries = []
+        exercises = {}
+        for row in conn.execute(query, params):
+            exercise = exercises[row['id']] = {
+                'id': row['exercise_id'],
+                'name': row['exercise_name'],
+                'substitution_id': row['substitution_id'],
+                'sets': []
+            }
+            entries.append({
+                'date': row['date'],
+                'week': row['week'],
+                'workout_type': row['workout_type'],
+                'exercises': [exercise]
+            })
+        self._attach_sets(conn, exercises)
+        return entries
+    
+    def get_preferences(self, user_id):
+        conn = self._connection()
+        return {row['key']: json.loads(row['value']) for row in conn.execute(
+            'SELECT key, value FROM user_preferences WHERE user_id = ?', (user_id,))}
+    
+    def save_preferences(self, user_id, preferences):
+        """Upsert a batch of preference values (any JSON) in one transaction"""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT INTO user_preferences (user_id, key, value, updated_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at',
+                [(user_id, key, json.dumps(value), now) for key, value in preferences.items()])
+    
+    def iter_export_rows(self, user_id, batch_size=500):
+        """
+        Yield every stored set joined with its session and exercise, oldest first.
+        Runs on its own connection in one read transaction, so the export is a
+        consistent snapshot and only batch_size rows are held in memory at a time.
+        """
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN')
+            cursor = conn.execute(
+                'SELECT s.id AS session_id, s.date, s.week, s.workout_type, '
+                'se.exercise_id, se.exercise_name, se.substitution_id, '
+                'es.set_number, es.weight, es.reps, es.rpe '
+                'FROM workout_sessions s '
+                'JOIN session_exercises se ON se.session_id = s.id '
+                'LEFT JOIN exercise_sets es ON es.session_exercise_id = se.id '
+                'WHERE s.user_id = ? '
+                'ORDER BY s.date, s.id, se.position, es.set_number', (user_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+    
+    def _attach_sets(self, conn, exercises):
+        if not exercises:
+            return
+        placeholders = ', '.join('?' * len(exercises))
+        for row in conn.execute(
+                'SELECT session_exercise_id, weight, reps, rpe FROM exercise_sets '
+                f'WHERE session_exercise_id IN ({placeholders}) ORDER BY session_exercise_id, set_number',
+                list(exercises)):
+            exercises[row['session_exercise_id']]['sets'].append(
+                {'weight': row['weight'], 'reps': row['reps'], 'rpe': row['rpe']})
+
+history_store = WorkoutHistoryStore(HISTORY_DB_PATH)
+
+def current_user_id():
+    """History owner for the current session (the tracker has a single shared login)"""
+    return session.get('user_id', DEFAULT_USER_ID)
+
+def _to_number(value, cast=float):
+    """Parse a form value such as '102.5' or 8; blanks, junk and infinities become None"""
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+        return cast(number) if math.isfinite(number) else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+def _is_text(value):
+    """True for a string SQLite can store (lone surrogates such as "\\ud800" are not valid UTF-8)"""
+    if not isinstance(value, str):
+        return False
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+def _optional_string(value):
+    """True for a missing value or a storable string (JSON numbers, lists and objects are rejected)"""
+    return value is None or _is_text(value)
+
+# Accepted ranges for logged values; anything outside them is a client bug, not a workout
+WORKOUT_WEEK_RANGE = (1, 1000)
+SET_VALUE_RANGES = {'weight': (-10000, 100000), 'reps': (0, 10000), 'rpe': (0, 10)}
+
+def normalize_workout_session(data):
+    """
+    Validate a posted workout session and normalize it for the history store.
+    Returns (session, None) or (None, error message).
+    """
+    required_fields = ['week', 'workout_type', 'date', 'exercises']
+    if not isinstance(data, dict) or not all(field in data for field in required_fields):
+        return None, 'Missing required fields'
+    if not isinstance(data['exercises'], list):
+        return None, 'exercises must be a list'
+    week = data['week']
+    week = None if isinstance(week, bool) else UltimateWorkoutDatabase.normalize_week(week)
+    if not isinstance(week, int):
+        return None, 'week must be a whole number'
+    if not WORKOUT_WEEK_RANGE[0] <= week <= WORKOUT_WEEK_RANGE[1]:
+        return None, f'week must be between {WORKOUT_WEEK_RANGE[0]} and {WORKOUT_WEEK_RANGE[1]}'
+    if not _is_text(data['workout_type']) or not data['workout_type'].strip():
+        return None, 'workout_type must be a non-empty string'
+    # ISO dates only: history is ordered, paged (?before=) and aggregated by this string
+    date = data['date']
+    try:
+        if not isinstance(date, str) or len(date) != 10:
+            raise ValueError(date)
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return None, 'date must be YYYY-MM-DD'
+    
+    exercises = []
+    for exercise in data['exercises']:
+        if not isinstance(exercise, dict):
+            return None, 'Each exercise must be an object'
+        if not all(_optional_string(exercise.get(field)) for field in ('id', 'name', 'substitution_id')):
+            return None, 'Exercise id, name and substitution_id must be strings'
+        catalog_exercise = db.get_exercise_by_id(exercise.get('id'))
+        name = exercise.get('name') or (catalog_exercise['name'] if catalog_exercise else None)
+        if not name:
+            return None, 'Each exercise needs a name or a known id'
+        if exercise.get('sets') is not None and not isinstance(exercise['sets'], list):
+            return None, 'sets must be a list'
+        sets = []
+        for s in exercise.get('sets') or []:
+            if not isinstance(s, dict):
+                continue
+            values = {
+                'weight': _to_number(s.get('weight')),
+                'reps': _to_number(s.get('reps'), int),
+                'rpe': _to_number(s.get('rpe'))
+            }
+            for field, value in values.items():
+                low, high = SET_VALUE_RANGES[field]
+                if value is not None and not low <= value <= high:
+                    return None, f'{field} must be between {low} and {high}'
+            if values['weight'] is not None or values['reps'] is not None:
+                sets.append(values)
+        exercises.append({
+            'id': str(exercise.get('id') or name),
+            'name': name,
+            'substitution_id': exercise.get('substitution_id'),
+            'sets': sets
+        })
+    
+    return {
+        'date': date,
+        'week': week,
+        'workout_type': data['workout_type'],
+        'exercises': exercises
+    }, None
 
 # Progress tracking and workout history endpoints
 @app.route('/api/workout-history', methods=['POST'])
+@login_required
 def save_workout_session():
-    """Save a completed workout session"""
-    data = request.get_json()
+    """Save one completed workout session, or a batch posted as {"sessions": [...]}"""
+    data = request.get_json(silent=True)
+    batch = isinstance(data, dict) and 'sessions' in data
+    posted = data['sessions'] if batch else [data]
+    if not isinstance(posted, list) or not posted:
+        return jsonify({'error': 'sessions must be a non-empty list'}), 400
     
-    # Basic validation
-    required_fields = ['week', 'workout_type', 'date', 'exercises']
-    if not all(field in data for field in required_fields):
-        return jsonify({'error': 'Missing required fields'}), 400
+    sessions = []
+    for item in posted:
+        workout, error = normalize_workout_session(item)
+        if error:
+            return jsonify({'error': error}), 400
+        sessions.append(workout)
     
-    # In a real application, this would save to a database
-    # For now, we'll return success to indicate the endpoint works
-    return jsonify({'success': True, 'message': 'Workout session saved'})
+    session_ids = history_store.save_sessions(current_user_id(), sessions)
+    message = f'{len(sessions)} workout sessions saved' if batch else 'Workout session saved'
+    return jsonify({'success': True, 'message': message, 'session_ids': session_ids})
 
 @app.route('/api/workout-history')
+@login_required
 def get_workout_history():
-    """Get workout history for progress tracking"""
-    # In a real application, this would query a database
-    # For now, return empty history
-    return jsonify([])
+    """Get workout history for progress tracking, newest first (?exercise=, ?limit=, ?before=date)"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    before = request.args.get('before')
+    exercise_name = request.args.get('exercise')
+    if exercise_name:
+        history = history_store.get_exercise_history(current_user_id(), exercise_name, limit, before)
+    else:
+        history = history_store.get_sessions(current_user_id(), limit, before)
+    return jsonify(history)
 
-@app.route('/api/progress/<exercise_name>')
+@app.route('/api/progress/<path:exercise_name>')
+@login_required
 def get_exercise_progress(exercise_name):
-    """Get progress data for a specific exercise"""
-    # In a real application, this would analyze historical data
-    # For now, return empty progress data
-    return jsonify({
-        'exercise': exercise_name,
-        'sessions': [],
-        'max_weight': 0,
-        'total_volume': 0,
-        'avg_rpe': 0
-    })
+    """Get progress data for a specific exercise from its materialized aggregates"""
+    limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+    return jsonify(history_store.get_progress(current_user_id(), exercise_name, limit))
+
+@app.route('/api/preferences')
+@login_required
+def get_preferences():
+    """Get the stored user preferences (e.g. exerciseSubstitutions, currentSelections)"""
+    return jsonify(history_store.get_preferences(current_user_id()))
+
+@app.route('/api/preferences', methods=['PUT'])
+@login_required
+def save_preferences():
+    """Store user preferences from a JSON object of key -> value"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Preferences must be a JSON object'}), 400
+    # Values are stored as ASCII JSON; keys are stored as they are
+    if not all(_is_text(key) for key in data):
+        return jsonify({'error': 'Preference keys must be valid UTF-8 strings'}), 400
+    history_store.save_preferences(current_user_id(), data)
+    return jsonify({'success': True})
+
+EXPORT_CSV_COLUMNS = ['date', 'week', 'workout_type', 'exercise_id', 'exercise_name',
+                      'substitution_id', 'set_number', 'weight', 'reps', 'rpe']
+
+class _EchoWriter:
+    """File-like object for csv.writer that hands each formatted row straight back"""
+    
+    def write(self, value):
+        return value
+
+def export_ndjson(user_id, preferences):
+    """
+    Stream the export as newline-delimited JSON: an export header, then session,
+    exercise and set records in date order, then substitution and preference records
+    """
+    def line(record):
+        return json.dumps(record, ensure_ascii=False) + '\n'
+    
+    yield line({'type': 'export', 'export_date': datetime.now(timezone.utc).isoformat(), 'user_id': user_id})
+    
+    session_id = exercise_key = None
+    for row in history_store.iter_export_rows(user_id):
+        if row['session_id'] != session_id:
+            session_id = row['session_id']
+            exercise_key = None
+            yield line({'type': 'session', 'session_id': session_id, 'date': row['date'],
+                        'week': row['week'], 'workout_type': row['workout_type']})
+        if row['exercise_id'] != exercise_key:
+            exercise_key = row['exercise_id']
+            yield line({'type': 'exercise', 'session_id': session_id, 'exercise_id': row['exercise_id'],
+                        'name': row['exercise_name'], 'substitution_id': row['substitution_id']})
+        if row['set_number'] is not None:
+            yield line({'type': 'set', 'session_id': session_id, 'exercise_id': row['exercise_id'],
+                        'set_number': row['set_number'], 'weight': row['weight'],
+                        'reps': row['reps'], 'rpe': row['rpe']})
+    
+    for key, value in preferences.items():
+        if key == 'exerciseSubstitutions' and isinstance(value, dict):
+            for original_id, substitution_id in value.items():
+                yield line({'type': 'substitution', 'original_id': original_id,
+                            'substitution_id': substitution_id})
+        else:
+            yield line({'type': 'preference', 'key': key, 'value': value})
+
+def export_csv(user_id):
+    """Stream the export as CSV, one row per logged set"""
+    writer = csv.writer(_EchoWriter())
+    yield writer.writerow(EXPORT_CSV_COLUMNS)
+    for row in history_store.iter_export_rows(user_id):
+        yield writer.writerow([row[column] for column in EXPORT_CSV_COLUMNS])
 
 @app.route('/api/export-data')
+@login_required
 def export_workout_data():
-    """Export all workout data as JSON"""
-    # This would typically export from a database
-    # For now, return a template for the export format
-    return jsonify({
-        'export_date': datetime.now().isoformat(),
-        'workout_sessions': [],
-        'exercise_progress': {},
-        'user_preferences': {}
-    })
+    """Stream all workout data as NDJSON (default) or CSV (?format=csv)"""
+    user_id = current_user_id()
+    export_format = request.args.get('format', 'ndjson')
+    if export_format == 'csv':
+        body, mimetype = export_csv(user_id), 'text/csv'
+    elif export_format == 'ndjson':
+        body, mimetype = export_ndjson(user_id, history_store.get_preferences(user_id)), 'application/x-ndjson'
+    else:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    
+    response = app.response_class(body, mimetype=mimetype)
+    filename = f"workout-data-{datetime.now().strftime('%Y-%m-%d')}.{export_format}"
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 # Enhanced HTML Template with improved equipment categorization
 LOGIN_TEMPLATE = '''
@@ -1636,6 +3476,8 @@ HTML_TEMPLATE = r'''
         }
         
         .session-header {
+            display: flex;
+            justify-content: space-between;
             margin-bottom: 0.75rem;
             color: #2d3748;
         }
@@ -1865,6 +3707,7 @@ HTML_TEMPLATE = r'''
                 ">🟢 Online</div>
                 <a href="#" class="nav-btn active" onclick="showPage('workout')">Workout</a>
                 <a href="#" class="nav-btn" onclick="showPage('database')">Exercise DB</a>
+                <a href="#" class="nav-btn" onclick="showPage('progress')">Progress</a>
             </nav>
         </div>
     </div>
@@ -1900,6 +3743,42 @@ HTML_TEMPLATE = r'''
         <div id="database-page" class="page">
             <!-- Database content will be added here -->
         </div>
+
+        <!-- Progress Page -->
+        <div id="progress-page" class="page">
+            <div class="progress-controls">
+                <div class="control-group">
+                    <label for="exercise-select">Exercise</label>
+                    <select id="exercise-select" onchange="loadExerciseProgress()">
+                        <option value="">Choose an exercise...</option>
+                    </select>
+                </div>
+                <button class="btn btn-primary" onclick="exportWorkoutData()">Export Data</button>
+            </div>
+            
+            <div class="progress-stats">
+                <div class="stat-card">
+                    <h3>Total Workouts</h3>
+                    <div class="stat-number" id="total-workouts">0</div>
+                </div>
+                <div class="stat-card">
+                    <h3>This Week</h3>
+                    <div class="stat-number" id="week-workouts">0</div>
+                </div>
+                <div class="stat-card">
+                    <h3>Total Volume</h3>
+                    <div class="stat-number" id="total-volume">0 lbs</div>
+                </div>
+                <div class="stat-card">
+                    <h3>Avg Sets</h3>
+                    <div class="stat-number" id="avg-sets">0</div>
+                </div>
+            </div>
+            
+            <div id="exercise-progress-chart">
+                <p style="text-align: center; color: #718096; margin: 2rem 0;">Select an exercise to view progress charts</p>
+            </div>
+        </div>
     </div>
 
     <!-- Enhanced Substitution Modal -->
@@ -2009,13 +3888,16 @@ HTML_TEMPLATE = r'''
             // Load page-specific content
             if (pageId === 'database') {
                 loadExerciseDatabase();
+            } else if (pageId === 'progress') {
+                loadProgressPage();
             }
         }
 
         // Exercise Database functionality
         async function loadExerciseDatabase() {
             try {
-                const response = await fetch('/api/exercises', {
+                // One exercise per name, with just the fields the cards show (keep in sync with DATABASE_PAGE_EXERCISES_URL)
+                const response = await fetch('/api/exercises?unique=1&fields=id,name,muscle,equipment,reps,warmup_sets,working_sets,rest,notes,tutorial_url', {
                     credentials: 'same-origin'
                 });
                 
@@ -2023,20 +3905,9 @@ HTML_TEMPLATE = r'''
                     throw new Error('Failed to load exercises');
                 }
                 
-                const exercises = await response.json();
-                
-                // Filter to get only unique exercises by name
-                const uniqueExercises = [];
-                const seenNames = new Set();
+                const uniqueExercises = await response.json();
                 
-                exercises.forEach(exercise => {
-                    if (!seenNames.has(exercise.name)) {
-                        seenNames.add(exercise.name);
-                        uniqueExercises.push(exercise);
-                    }
-                });
-                
-                console.log(`📊 Exercise Database: Showing ${uniqueExercises.length} unique exercises (filtered from ${exercises.length} total)`);
+                console.log(`📊 Exercise Database: Showing ${uniqueExercises.length} unique exercises`);
             
             const databasePage = document.getElementById('database-page');
                 
@@ -2045,7 +3916,7 @@ HTML_TEMPLATE = r'''
                         <div class="controls-grid">
                             <div class="control-group">
                                 <label>Search Exercises</label>
-                                <input type="text" id="exercise-search" placeholder="Search by name..." 
+                                <input type="text" id="exercise-search" placeholder="Search name, muscle, equipment..." 
                                        onkeyup="filterExercises()" style="padding: 0.75rem 1rem; border: 2px solid #e2e8f0; border-radius: 8px; font-size: 1rem;">
                             </div>
                             <div class="control-group">
@@ -2136,14 +4007,101 @@ HTML_TEMPLATE = r'''
                 html += '</div>';
                 databasePage.innerHTML = html;
                 
+                populateFacetFilters();
+                
             } catch (error) {
                 console.error('Error loading exercise database:', error);
             }
         }
 
-        // Filter exercises in database
+        // Fill the muscle and equipment filters from the server's facet counts
+        async function populateFacetFilters() {
+            try {
+                const response = await fetch('/api/facets?unique=1&per_page=0', { credentials: 'same-origin' });
+                if (!response.ok) {
+                    return; // Keep the built-in options
+                }
+                const { facets } = await response.json();
+                [['muscle-filter', facets.muscle, 'All Muscles'], ['equipment-filter', facets.equipment, 'All Equipment']]
+                    .forEach(([selectId, counts, allLabel]) => {
+                        const select = document.getElementById(selectId);
+                        const current = select.value;
+                        select.innerHTML = `<option value="">${allLabel}</option>`;
+                        Object.entries(counts)
+                            .filter(([, count]) => count > 0)
+                            .sort(([a], [b]) => a.localeCompare(b))
+                            .forEach(([value, count]) => {
+                                const option = document.createElement('option');
+                                option.value = value;
+                                option.textContent = `${value} (${count})`;
+                                select.appendChild(option);
+                            });
+                        select.value = current;
+                    });
+            } catch (error) {
+                console.error('Error loading exercise filters:', error);
+            }
+        }
+
+        // Filter exercises in database; the search box shows substring matches plus the ranked
+        // (typo-tolerant) /api/search hits, ranked hits first
+        let searchTimeout = null;
+        let lastSearchTerm = '';
+        let searchRanking = null; // lowercase exercise name -> rank, null when there is no server ranking
+        
         function filterExercises() {
-            const searchTerm = document.getElementById('exercise-search').value.toLowerCase();
+            clearTimeout(searchTimeout);
+            searchTimeout = setTimeout(runExerciseSearch, 150);
+        }
+        
+        async function runExerciseSearch() {
+            const searchTerm = document.getElementById('exercise-search').value.trim().toLowerCase();
+            
+            if (searchTerm !== lastSearchTerm) {
+                lastSearchTerm = searchTerm;
+                searchRanking = null;
+                if (searchTerm) {
+                    try {
+                        const ranking = await fetchSearchRanking(searchTerm);
+                        // A newer search started while this one was in flight
+                        if (searchTerm !== lastSearchTerm) {
+                            return;
+                        }
+                        searchRanking = ranking;
+                    } catch (error) {
+                        // Offline: fall back to plain substring matching below
+                        console.error('Error searching exercises:', error);
+                    }
+                }
+            }
+            
+            applyExerciseFilters(searchTerm);
+        }
+        
+        // Rank of every /api/search hit by lowercase name, reading every page up to the reported total
+        async function fetchSearchRanking(searchTerm) {
+            const ranking = new Map();
+            for (let page = 1; ; page++) {
+                const response = await fetch(`/api/search?q=${encodeURIComponent(searchTerm)}&per_page=100&page=${page}`, {
+                    credentials: 'same-origin'
+                });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                }
+                const result = await response.json();
+                result.results.forEach(exercise => {
+                    const name = exercise.name.toLowerCase();
+                    if (!ranking.has(name)) {
+                        ranking.set(name, ranking.size);
+                    }
+                });
+                if (result.results.length === 0 || page * result.per_page >= result.total) {
+                    return ranking;
+                }
+            }
+        }
+        
+        function applyExerciseFilters(searchTerm) {
             const equipmentFilter = document.getElementById('equipment-filter').value;
             const muscleFilter = document.getElementById('muscle-filter').value;
             const exercises = document.querySelectorAll('.exercise-db-item');
@@ -2153,7 +4111,8 @@ HTML_TEMPLATE = r'''
                 const equipment = exercise.getAttribute('data-equipment');
                 const muscle = exercise.getAttribute('data-muscle');
                 
-                const matchesSearch = name.includes(searchTerm);
+                // Ranked hits add typo-tolerant matches; partial words inside a name still match by substring
+                const matchesSearch = name.includes(searchTerm) || (searchRanking !== null && searchRanking.has(name));
                 const matchesEquipment = !equipmentFilter || equipment === equipmentFilter;
                 const matchesMuscle = !muscleFilter || muscle === muscleFilter;
                 
@@ -2163,6 +4122,19 @@ HTML_TEMPLATE = r'''
                     exercise.style.display = 'none';
                 }
             });
+            
+            // Show ranked matches first, then substring-only ones, unless the user picked a name sort
+            if (searchRanking && !document.getElementById('name-sort').value) {
+                const exerciseResults = document.getElementById('exercise-results');
+                const rank = exercise => {
+                    const name = exercise.getAttribute('data-name');
+                    return searchRanking.has(name) ? searchRanking.get(name) : searchRanking.size;
+                };
+                Array.from(exercises)
+                    .filter(exercise => exercise.style.display !== 'none')
+                    .sort((a, b) => rank(a) - rank(b))
+                    .forEach(exercise => exerciseResults.appendChild(exercise));
+            }
         }
 
         // Sort and filter exercises
@@ -2281,6 +4253,7 @@ HTML_TEMPLATE = r'''
                 }
                 
                 const exercises = await response.json();
+                rememberOriginalExercises(exercises);
                 
                 if (exercises && exercises.length > 0) {
                     displayWorkout(exercises, week, workoutType);
@@ -2298,6 +4271,7 @@ HTML_TEMPLATE = r'''
                     );
                     
                     if (cachedExercises.length > 0) {
+                        rememberOriginalExercises(cachedExercises);
                         displayWorkout(cachedExercises, week, workoutType);
                         return;
                     }
@@ -2389,7 +4363,7 @@ HTML_TEMPLATE = r'''
                             <div class="rest-timer">
                                 <div class="rest-status">Rest Timer</div>
                                 <div class="timer-presets">
-                                    ${generateRestTimerButtons(exercise.rest, exerciseId)}
+                                    ${generateRestTimerButtons(exercise.prescription, exerciseId)}
                                 </div>
                                 <div id="timer-display-${exerciseId}" class="timer-display" style="display: none;"></div>
                                 <button id="stop-timer-${exerciseId}" class="btn btn-stop" onclick="stopRestTimer('${exerciseId}')" style="display: none;">Stop Timer</button>
@@ -2581,6 +4555,11 @@ HTML_TEMPLATE = r'''
             
             // Save completion status to localStorage
             saveExerciseCompletion(workoutKey, exerciseId, isCompleted);
+            
+            // Record the finished exercise in the server-side workout history
+            if (isCompleted) {
+                queueHistorySync(exerciseId, workoutKey);
+            }
         }
         
         function saveExerciseCompletion(workoutKey, exerciseId, isCompleted) {
@@ -2732,11 +4711,46 @@ HTML_TEMPLATE = r'''
         }
 
         // Get original exercise data
+        // Original (unsubstituted) exercises by ID, from workout loads and batched lookups
+        const originalExercises = new Map();
+        let pendingOriginalBatch = null;
+        
+        function rememberOriginalExercises(exercises) {
+            (exercises || []).forEach(exercise => originalExercises.set(exercise.id, exercise));
+        }
+        
+        // Lookups made in the same tick share one /api/exercises?ids= request
+        function loadOriginalExercises(exerciseIds) {
+            if (!pendingOriginalBatch) {
+                const batch = { ids: new Set() };
+                batch.promise = Promise.resolve().then(async () => {
+                    pendingOriginalBatch = null;
+                    const ids = [...batch.ids].map(encodeURIComponent).join(',');
+                    const response = await fetch(`/api/exercises?ids=${ids}&fields=id,name,muscle,equipment`, {
+                        credentials: 'same-origin'
+                    });
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                    }
+                    const result = await response.json();
+                    rememberOriginalExercises(result.exercises);
+                    if (result.missing.length > 0) {
+                        console.log('⚠️ Unknown exercise IDs:', result.missing);
+                    }
+                });
+                pendingOriginalBatch = batch;
+            }
+            exerciseIds.forEach(id => pendingOriginalBatch.ids.add(id));
+            return pendingOriginalBatch.promise;
+        }
+        
         async function getOriginalExercise(exerciseId) {
             try {
-                const response = await fetch(`/api/exercises/${exerciseId}`);
-                if (response.ok) {
-                    return await response.json();
+                if (!originalExercises.has(exerciseId)) {
+                    await loadOriginalExercises([exerciseId]);
+                }
+                if (originalExercises.has(exerciseId)) {
+                    return originalExercises.get(exerciseId);
                 }
             } catch (error) {
                 console.error('Error getting original exercise:', error);
@@ -2920,47 +4934,31 @@ HTML_TEMPLATE = r'''
             return html;
         }
 
-        // Generate rest timer buttons based on exercise rest time
-        function generateRestTimerButtons(restTime, exerciseId) {
-            if (!restTime) {
+        // Generate rest timer buttons from the exercise's parsed rest range (prescription.rest_seconds)
+        function generateRestTimerButtons(prescription, exerciseId) {
+            const rest = prescription && prescription.rest_seconds;
+            let presets;
+            if (!rest) {
                 // Default buttons if no rest time specified
-                return `
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 60)">1 min</button>
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 120)">2 min</button>
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 180)">3 min</button>
-                `;
-            }
-            
-            // Parse rest time (e.g., "1-2 min", "2-3 min", "3-5 min")
-            const restMatch = restTime.match(/(\d+)-(\d+)\s*min/);
-            if (restMatch) {
-                const minRest = parseInt(restMatch[1]);
-                const maxRest = parseInt(restMatch[2]);
-                
-                let buttons = '';
-                for (let i = minRest; i <= maxRest; i++) {
-                    buttons += `<button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', ${i * 60})">${i} min</button>`;
+                presets = [60, 120, 180];
+            } else if (rest.min === rest.max) {
+                // Single rest time (e.g., "2 min"): also a minute less and a minute more
+                presets = [rest.min - 60, rest.min, rest.min + 60].filter(seconds => seconds > 0);
+            } else {
+                // Rest range (e.g., "1-2 min", "3-5 min"): every minute across it
+                presets = [];
+                for (let seconds = rest.min; seconds <= rest.max; seconds += 60) {
+                    presets.push(seconds);
+                }
+                if (presets[presets.length - 1] !== rest.max) {
+                    presets.push(rest.max);
                 }
-                return buttons;
-            }
-            
-            // Single value rest time (e.g., "2 min")
-            const singleMatch = restTime.match(/(\d+)\s*min/);
-            if (singleMatch) {
-                const restMinutes = parseInt(singleMatch[1]);
-                return `
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', ${(restMinutes - 1) * 60})">${restMinutes - 1} min</button>
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', ${restMinutes * 60})">${restMinutes} min</button>
-                    <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', ${(restMinutes + 1) * 60})">${restMinutes + 1} min</button>
-                `;
             }
             
-            // Fallback to default
-            return `
-                <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 60)">1 min</button>
-                <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 120)">2 min</button>
-                <button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', 180)">3 min</button>
-            `;
+            return presets.map(seconds => {
+                const label = seconds % 60 ? `${seconds} sec` : `${seconds / 60} min`;
+                return `<button class="btn btn-preset" onclick="startRestTimer('${exerciseId}', ${seconds})">${label}</button>`;
+            }).join('');
         }
 
         // Calculate warmup sets
@@ -3163,15 +5161,14 @@ HTML_TEMPLATE = r'''
         
         function loadProgressPage() {
             // Load exercise list for progress tracking
-            fetch('/api/exercises')
+            fetch('/api/exercises?fields=name&unique=1')
                 .then(response => response.json())
                 .then(exercises => {
                     const select = document.getElementById('exercise-select');
                     select.innerHTML = '<option value="">Choose an exercise...</option>';
                     
-                    // Get unique exercise names
-                    const uniqueExercises = [...new Set(exercises.map(ex => ex.name))];
-                    uniqueExercises.sort().forEach(exerciseName => {
+                    // Names arrive unique already
+                    exercises.map(ex => ex.name).sort().forEach(exerciseName => {
                         const option = document.createElement('option');
                         option.value = exerciseName;
                         option.textContent = exerciseName;
@@ -3217,81 +5214,98 @@ HTML_TEMPLATE = r'''
             document.getElementById('avg-sets').textContent = totalWorkouts > 0 ? Math.round(Object.values(workoutData).reduce((sum, w) => sum + (w.sets ? w.sets.length : 0), 0) / totalWorkouts) : '0';
         }
         
-        function loadExerciseProgress() {
+        async function loadExerciseProgress() {
             const exerciseName = document.getElementById('exercise-select').value;
+            const chart = document.getElementById('exercise-progress-chart');
             if (!exerciseName) {
-                document.getElementById('exercise-progress-chart').innerHTML = 
+                chart.innerHTML = 
                     '<p style="text-align: center; color: #718096; margin: 2rem 0;">Select an exercise to view progress charts</p>';
                 return;
             }
             
-            // Find all workout sessions for this exercise
-            const exerciseSessions = [];
-            for (const [key, workout] of Object.entries(workoutData)) {
-                if (key.includes(exerciseName) && workout.sets && workout.sets.length > 0) {
-                    const [week, day] = key.split('-');
-                    exerciseSessions.push({
-                        week: parseInt(week),
-                        day: day,
-                        sets: workout.sets,
-                        date: new Date().toISOString() // In real app, this would be stored
-                    });
+            // Per-session aggregates come precomputed from the workout history store
+            let progress;
+            try {
+                const response = await fetch(`/api/progress/${encodeURIComponent(exerciseName)}`, { credentials: 'same-origin' });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
                 }
+                progress = await response.json();
+            } catch (error) {
+                console.error('❌ Error loading exercise progress:', error);
+                chart.innerHTML = 
+                    '<p style="text-align: center; color: #718096; margin: 2rem 0;">Progress is unavailable offline</p>';
+                return;
+            }
+            // The selection may have changed while the request was in flight
+            if (document.getElementById('exercise-select').value !== exerciseName) {
+                return;
             }
             
-            if (exerciseSessions.length === 0) {
-                document.getElementById('exercise-progress-chart').innerHTML = 
+            if (progress.sessions.length === 0) {
+                chart.innerHTML = 
                     '<p style="text-align: center; color: #718096; margin: 2rem 0;">No data available for this exercise</p>';
                 return;
             }
             
-            // Sort by week
-            exerciseSessions.sort((a, b) => a.week - b.week);
+            // Sessions arrive newest first; show them oldest first
+            const exerciseSessions = [...progress.sessions].reverse();
             
             // Generate progress chart HTML
             let chartHTML = `
                 <h3 style="margin-bottom: 1rem;">${exerciseName} Progress</h3>
+                <p style="color: #718096; margin-bottom: 1rem;">
+                    ${progress.session_count} sessions · best ${progress.max_weight} lbs · ${Math.round(progress.total_volume)} lbs total volume
+                </p>
                 <div class="progress-sessions">
             `;
             
-            exerciseSessions.forEach((session, index) => {
-                const maxWeight = Math.max(...session.sets.map(set => parseFloat(set.weight) || 0));
-                const totalVolume = session.sets.reduce((sum, set) => 
-                    sum + (parseFloat(set.weight) || 0) * (parseInt(set.reps) || 0), 0);
-                
+            exerciseSessions.forEach(session => {
                 chartHTML += `
                     <div class="session-card">
                         <div class="session-header">
-                            <strong>Week ${session.week} - ${session.day}</strong>
+                            <strong>Week ${session.week} - ${session.workout_type}</strong>
+                            <span>${session.date}</span>
                         </div>
                         <div class="session-stats">
                             <div class="session-stat">
                                 <span>Max Weight:</span>
-                                <span>${maxWeight} lbs</span>
+                                <span>${session.max_weight} lbs</span>
                             </div>
                             <div class="session-stat">
                                 <span>Volume:</span>
-                                <span>${Math.round(totalVolume)} lbs</span>
+                                <span>${Math.round(session.volume)} lbs</span>
                             </div>
                             <div class="session-stat">
                                 <span>Sets:</span>
-                                <span>${session.sets.length}</span>
+                                <span>${session.sets}</span>
+                            </div>
+                            <div class="session-stat">
+                                <span>Avg RPE:</span>
+                                <span>${session.avg_rpe || '-'}</span>
                             </div>
-                        </div>
-                        <div class="session-sets">
-                            ${session.sets.map((set, i) => 
-                                `<span class="set-badge">${set.weight || 0}×${set.reps || 0}</span>`
-                            ).join('')}
                         </div>
                     </div>
                 `;
             });
             
             chartHTML += '</div>';
-            document.getElementById('exercise-progress-chart').innerHTML = chartHTML;
+            chart.innerHTML = chartHTML;
         }
         
-        function exportWorkoutData() {
+        async function exportWorkoutData() {
+            // The server streams the full workout history; sync anything still queued first
+            if (navigator.onLine) {
+                await flushHistorySync();
+                const a = document.createElement('a');
+                a.href = '/api/export-data';
+                document.body.appendChild(a);
+                a.click();
+                document.body.removeChild(a);
+                return;
+            }
+            
+            // Offline: export what this device has locally
             const dataToExport = {
                 export_date: new Date().toISOString(),
                 workout_data: workoutData,
@@ -3321,6 +5335,71 @@ HTML_TEMPLATE = r'''
             }
         }
 
+        // Workout history sync: completed exercises are queued locally and posted in batches
+        let historySyncTimeout = null;
+        
+        function queueHistorySync(exerciseId, workoutKey) {
+            const titleElement = document.querySelector(`#exercise-${exerciseId} .exercise-title`);
+            const entry = {
+                date: new Date().toLocaleDateString('en-CA'), // YYYY-MM-DD in local time
+                week: document.getElementById('week-select').value,
+                workout_type: document.getElementById('day-select').value,
+                exercise: {
+                    id: exerciseId,
+                    name: titleElement ? titleElement.textContent.replace(/^\d+\.\s*/, '') : undefined,
+                    substitution_id: getStoredSubstitution(exerciseId),
+                    sets: (workoutData[workoutKey] && workoutData[workoutKey].sets) || []
+                }
+            };
+            
+            const pending = JSON.parse(localStorage.getItem('pendingHistory') || '[]');
+            pending.push(entry);
+            localStorage.setItem('pendingHistory', JSON.stringify(pending));
+            
+            // Debounce so exercises completed close together go out in one request
+            clearTimeout(historySyncTimeout);
+            historySyncTimeout = setTimeout(flushHistorySync, 2000);
+        }
+        
+        async function flushHistorySync() {
+            const pending = JSON.parse(localStorage.getItem('pendingHistory') || '[]');
+            if (pending.length === 0 || !navigator.onLine) {
+                return;
+            }
+            
+            // Group queued exercises into one session per date, week and workout type
+            const sessions = {};
+            pending.forEach(entry => {
+                const key = `${entry.date}|${entry.week}|${entry.workout_type}`;
+                if (!sessions[key]) {
+                    sessions[key] = { date: entry.date, week: entry.week, workout_type: entry.workout_type, exercises: [] };
+                }
+                sessions[key].exercises.push(entry.exercise);
+            });
+            
+            try {
+                const response = await fetch('/api/workout-history', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'same-origin',
+                    body: JSON.stringify({ sessions: Object.values(sessions) })
+                });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+                }
+                
+                // Keep anything queued while the request was in flight
+                const remaining = JSON.parse(localStorage.getItem('pendingHistory') || '[]').slice(pending.length);
+                localStorage.setItem('pendingHistory', JSON.stringify(remaining));
+                console.log('✅ Synced', pending.length, 'completed exercises to workout history');
+            } catch (error) {
+                console.error('❌ Error syncing workout history, will retry when online:', error);
+            }
+        }
+        
+        window.addEventListener('online', flushHistorySync);
+        document.addEventListener('DOMContentLoaded', flushHistorySync);
+
         // Substitution persistence functions
         function storeSubstitution(originalId, substitutionId, isReset = false) {
             let substitutions = JSON.parse(localStorage.getItem('exerciseSubstitutions') || '{}');
@@ -3335,6 +5414,14 @@ HTML_TEMPLATE = r'''
             
             localStorage.setItem('exerciseSubstitutions', JSON.stringify(substitutions));
             console.log('💾 Stored substitution:', originalId, '->', substitutionId, isReset ? '(reset)' : '');
+            
+            // Mirror to the server so substitutions are part of the data export
+            fetch('/api/preferences', {
+                method: 'PUT',
+                headers: { 'Content-Type': 'application/json' },
+                credentials: 'same-origin',
+                body: JSON.stringify({ exerciseSubstitutions: substitutions })
+            }).catch(error => console.error('❌ Error saving substitution preference:', error));
         }
 
         function getStoredSubstitution(originalId) {
@@ -3352,38 +5439,44 @@ HTML_TEMPLATE = r'''
             const substitutions = JSON.parse(localStorage.getItem('exerciseSubstitutions') || '{}');
             console.log('🔍 All stored substitutions:', substitutions);
             
+            // Only resolve substitutions for exercise cards on the current page
+            const pending = {};
             for (const [originalId, substitutionId] of Object.entries(substitutions)) {
-                try {
-                    // Check if the exercise card exists on current page
-                    const exerciseCard = document.querySelector(`[data-exercise-id="${originalId}"]`);
-                    if (exerciseCard) {
-                        console.log('🔄 Applying stored substitution:', originalId, '->', substitutionId);
-                        
-                        // Apply the substitution silently (without showing success message)
-                        const response = await fetch('/api/substitute', {
-                            method: 'POST',
-                            headers: { 'Content-Type': 'application/json' },
-                            credentials: 'same-origin',
-                            body: JSON.stringify({
-                                original_id: originalId,
-                                substitution_id: substitutionId
-                            })
-                        });
-                        
-                        if (response.ok) {
-                            const substitutionExercise = await response.json();
-                            console.log('✅ Substitution loaded:', substitutionExercise.name);
-                            updateExerciseCard(originalId, substitutionExercise);
-                        } else {
-                            const error = await response.json();
-                            console.error('❌ Substitution failed:', error);
-                        }
-                    } else {
-                        console.log('⚠️ Exercise card not found for:', originalId);
-                    }
-                } catch (error) {
-                    console.error('Error applying stored substitution:', error);
+                if (document.querySelector(`[data-exercise-id="${originalId}"]`)) {
+                    pending[originalId] = substitutionId;
+                } else {
+                    console.log('⚠️ Exercise card not found for:', originalId);
+                }
+            }
+            
+            if (Object.keys(pending).length === 0) {
+                return;
+            }
+            
+            try {
+                // Resolve every substitution in one round trip
+                const response = await fetch('/api/substitute/batch', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    credentials: 'same-origin',
+                    body: JSON.stringify({ substitutions: pending })
+                });
+                
+                const result = await response.json();
+                if (!response.ok) {
+                    console.error('❌ Substitutions failed:', result);
+                    return;
                 }
+                
+                for (const [originalId, substitutionExercise] of Object.entries(result.exercises)) {
+                    console.log('✅ Substitution loaded:', substitutionExercise.name);
+                    updateExerciseCard(originalId, substitutionExercise);
+                }
+                result.missing.forEach(originalId => {
+                    console.error('❌ Substitution not found:', originalId, '->', pending[originalId]);
+                });
+            } catch (error) {
+                console.error('Error applying stored substitutions:', error);
             }
         }
 
@@ -3460,40 +5553,34 @@ HTML_TEMPLATE = r'''
             console.log('Pre-caching workout data for offline use...');
             
             try {
-                // Load and cache all exercise data
-                const response = await fetch('/api/exercises', { credentials: 'same-origin' });
-                if (response.ok) {
-                    cachedWorkoutData = await response.json();
-                    console.log(`✅ Cached ${cachedWorkoutData.length} exercises for offline use`);
-                    
-                    // Save to localStorage for offline access
-                    try {
-                        localStorage.setItem('cachedWorkoutData', JSON.stringify(cachedWorkoutData));
-                        console.log('✅ Cached workout data saved to localStorage');
-                    } catch (error) {
-                        console.error('❌ Error saving cached workout data:', error);
-                    }
+                // With a cached copy, only fetch what changed since its catalog version
+                const cachedVersion = localStorage.getItem('cachedWorkoutVersion');
+                let version = cachedWorkoutData && cachedVersion ? await syncCachedWorkoutData(cachedVersion) : null;
+                if (version === cachedVersion) {
+                    console.log('✅ Cached workout data is up to date');
+                    return;
                 }
                 
-                // Cache all week/workout type combinations
-                for (let week = 1; week <= 12; week++) {
-                    const workoutTypes = ['Upper (Strength)', 'Lower (Strength)', 'Pull (Hypertrophy)', 'Push (Hypertrophy)', 'Legs (Hypertrophy)'];
-                    
-                    for (const workoutType of workoutTypes) {
-                        const url = `/api/exercises?week=${week}&workout_type=${encodeURIComponent(workoutType)}`;
-                        try {
-                            await fetch(url, { credentials: 'same-origin' });
-                        } catch (e) {
-                            console.log(`Failed to cache: ${url}`);
-                        }
+                if (!version) {
+                    // The whole program (every week and workout type) comes back in one compact response
+                    const response = await fetch('/api/program?format=compact', { credentials: 'same-origin' });
+                    if (!response.ok) {
+                        throw new Error(`HTTP ${response.status}: ${response.statusText}`);
                     }
+                    
+                    const program = await response.json();
+                    cachedWorkoutData = decodeCompactExercises(program.exercises);
+                    version = program.version;
                 }
+                console.log(`✅ Cached ${cachedWorkoutData.length} exercises for offline use`);
                 
-                // Cache exercise database
+                // Save to localStorage for offline access
                 try {
-                    await fetch('/api/exercises', { credentials: 'same-origin' });
-                } catch (e) {
-                    console.log('Failed to cache exercise database');
+                    localStorage.setItem('cachedWorkoutData', JSON.stringify(cachedWorkoutData));
+                    localStorage.setItem('cachedWorkoutVersion', version);
+                    console.log('✅ Cached workout data saved to localStorage');
+                } catch (error) {
+                    console.error('❌ Error saving cached workout data:', error);
                 }
                 
                 console.log('✅ Workout data cached for offline use!');
@@ -3506,6 +5593,53 @@ HTML_TEMPLATE = r'''
             }
         }
 
+        // Bring cachedWorkoutData up to date from the catalog changes since `since`;
+        // returns the new catalog version, or null when the whole program has to be downloaded again
+        async function syncCachedWorkoutData(since) {
+            const response = await fetch(`/api/catalog/changes?since=${encodeURIComponent(since)}`, { credentials: 'same-origin' });
+            if (!response.ok) {
+                console.log(`ℹ️ No catalog changes since ${since} (HTTP ${response.status}), downloading the program`);
+                return null;
+            }
+            
+            const changes = await response.json();
+            const exercises = new Map(cachedWorkoutData.map(ex => [ex.id, ex]));
+            changes.removed.forEach(id => exercises.delete(id));
+            changes.changed.forEach(ex => exercises.set(ex.id, ex));
+            cachedWorkoutData = changes.order
+                ? changes.order.map(id => exercises.get(id)).filter(Boolean)
+                : [...exercises.values()];
+            console.log(`🔄 Catalog ${since} → ${changes.version}: ${changes.changed.length} changed, ${changes.removed.length} removed`);
+            return changes.version;
+        }
+
+        // Decode a ?format=compact table (shared value table + one code column per field) into exercise objects
+        function decodeCompactExercises(table) {
+            const decodeRows = (encoded, records) => {
+                const rows = Array.from({ length: encoded.count }, () => ({}));
+                // Each row's substitutions are the next records, in column order
+                let nextRecord = 0;
+                encoded.fields.forEach((field, index) => {
+                    const plain = encoded.plain.includes(field);
+                    const ownsRecords = records && table.record_fields.includes(field);
+                    encoded.columns[index].forEach((code, row) => {
+                        if (plain) {
+                            rows[row][field] = code;
+                        } else if (code === -1) {
+                            return;
+                        } else if (ownsRecords) {
+                            rows[row][field] = records.slice(nextRecord, nextRecord + code);
+                            nextRecord += code;
+                        } else {
+                            rows[row][field] = Array.isArray(code) ? code.map(i => table.strings[i]) : table.strings[code];
+                        }
+                    });
+                });
+                return rows;
+            };
+            return decodeRows(table, decodeRows(table.records, null));
+        }
+
         // Show offline ready notification
         function showOfflineReadyNotification() {
             const notification = document.createElement('div');
@@ -3572,21 +5706,153 @@ HTML_TEMPLATE = r'''
 </html>
 '''
 
+# Static asset build: the inline CSS and JS of HTML_TEMPLATE are split out into
+# content-hashed bundles so browsers can cache them for good
+ASSET_DIR = os.path.join(app.root_path, 'static', 'dist')
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+ASSET_BLOCKS = [
+    # (pattern, extension, mimetype, replacement tag)
+    (re.compile(r'<style>(.*?)</style>', re.S), 'css', 'text/css',
+     '<link rel="stylesheet" href="/assets/{name}">'),
+    (re.compile(r'<script>(.*?)</script>', re.S), 'js', 'application/javascript',
+     '<script src="/assets/{name}"></script>'),
+]
+
+def minify_css(css):
+    """Strip comments and collapse whitespace in a stylesheet"""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.S)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    return css.replace(';}', '}').strip()
+
+def minify_js(js):
+    """Drop indentation, blank lines and whole-line comments; line breaks are kept so ASI still holds"""
+    lines = []
+    for line in js.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+def write_asset(path, data, force=False):
+    """Write a build output unless an earlier build already did (names are content hashes); True if written"""
+    if not force and os.path.exists(path):
+        return False
+    atomic_write(path, data)
+    return True
+
+def build_static_assets(template, force=False, written=None):
+    """
+    Split the inline <style> and <script> blocks out of a page template.
+    Each block is minified, written as app.<hash>.<ext> plus a gzip copy, and
+    replaced by a tag pointing at it. Returns (shell template, {filename: mimetype}).
+    A block whose bundle cannot be written (read-only app directory) stays inline.
+    force rewrites bundles that already exist; paths actually written are appended to written.
+    """
+    try:
+        os.makedirs(ASSET_DIR, exist_ok=True)
+    except OSError as e:
+        app.logger.warning("⚠️ Could not create %s, serving styles and scripts inline: %s", ASSET_DIR, e)
+        return template, {}
+    assets = {}
+    for pattern, ext, mimetype, tag in ASSET_BLOCKS:
+        match = pattern.search(template)
+        if not match:
+            continue
+        minify = minify_css if ext == 'css' else minify_js
+        data = minify(match.group(1)).encode('utf-8')
+        name = f'app.{hashlib.sha256(data).hexdigest()[:12]}.{ext}'
+        path = os.path.join(ASSET_DIR, name)
+        try:
+            for output_path, output in ((path, data), (path + '.gz', gzip.compress(data, 9, mtime=0))):
+                if write_asset(output_path, output, force) and written is not None:
+                    written.append(output_path)
+        except OSError as e:
+            app.logger.warning("⚠️ Could not write %s, serving it inline: %s", path, e)
+            continue
+        assets[name] = mimetype
+        template = template[:match.start()] + tag.format(name=name) + template[match.end():]
+    return template, assets
+
+INDEX_SHELL_TEMPLATE, STATIC_ASSETS = build_static_assets(HTML_TEMPLATE)
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Rebuild the fingerprinted CSS/JS bundles for the main page and report the files written"""
+    written = []
+    _, assets = build_static_assets(HTML_TEMPLATE, force=True, written=written)
+    print(f"📦 Built {len(assets)} bundles in {ASSET_DIR}:")
+    for path in written:
+        print(f"   • {os.path.basename(path)} ({os.path.getsize(path) / 1024:.1f} KiB)")
+
+@app.route('/assets/<filename>')
+def static_asset(filename):
+    """Serve a fingerprinted bundle, precompressed when the client accepts gzip"""
+    mimetype = STATIC_ASSETS.get(filename)
+    if mimetype is None:
+        abort(404)
+    path = os.path.join(ASSET_DIR, filename)
+    use_gzip = request.accept_encodings['gzip'] > 0
+    response = send_file(path + '.gz' if use_gzip else path, mimetype=mimetype,
+                         download_name=filename, max_age=ASSET_MAX_AGE, conditional=True)
+    if use_gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+# Compile both page templates once at startup instead of on every request
+LOGIN_PAGE = app.jinja_env.from_string(LOGIN_TEMPLATE)
+INDEX_PAGE = app.jinja_env.from_string(INDEX_SHELL_TEMPLATE)
+
+# The main page has no per-request data, so render it once and serve the bytes
+INDEX_PAGE_BODY = INDEX_PAGE.render().encode('utf-8')
+INDEX_PAGE_ETAG = hashlib.sha256(INDEX_PAGE_BODY).hexdigest()[:16]
+
 @app.route('/')
 @login_required
 def index():
-    return render_template_string(HTML_TEMPLATE)
+    response = app.response_class(INDEX_PAGE_BODY, mimetype='text/html')
+    response.set_etag(INDEX_PAGE_ETAG)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+# The service worker is kept in memory; its cache version follows the catalog
+# and the asset bundles so clients drop stale caches when either changes
+with open('service-worker.js', 'r') as f:
+    SERVICE_WORKER_SOURCE = f.read()
+
+_service_worker = (None, None, None)  # (catalog version, body, etag)
+
+def get_service_worker():
+    """Return the service worker script and its ETag for the current catalog"""
+    global _service_worker
+    catalog_version, body, etag = _service_worker
+    if catalog_version != db.version:
+        catalog_version = db.version
+        cache_version = hashlib.sha256(
+            ' '.join([catalog_version, *sorted(STATIC_ASSETS)]).encode('utf-8')
+        ).hexdigest()[:12]
+        precache_urls = ['/', PROGRAM_URL, DATABASE_PAGE_EXERCISES_URL] + [f'/assets/{name}' for name in sorted(STATIC_ASSETS)]
+        body = (SERVICE_WORKER_SOURCE
+                .replace('__CACHE_VERSION__', cache_version)
+                .replace('__PRECACHE_URLS__', json.dumps(precache_urls))).encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()[:16]
+        _service_worker = (catalog_version, body, etag)
+    return body, etag
 
 @app.route('/service-worker.js')
 def service_worker():
     """Serve the service worker file"""
-    with open('service-worker.js', 'r') as f:
-        content = f.read()
-    response = app.response_class(
-        content,
-        mimetype='application/javascript'
-    )
-    return response
+    body, etag = get_service_worker()
+    response = app.response_class(body, mimetype='application/javascript')
+    response.set_etag(etag)
+    # Browsers must revalidate so a new catalog version reaches clients promptly
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+# Every route is registered now, so the shared catalog responses can be compiled
+prepare_catalog(_catalog)
 
 if __name__ == '__main__':
     import os
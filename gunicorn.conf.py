@@ -0,0 +1,28 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app`.
+The catalog is loaded once in the master and shared with the forked workers.
+"""
+
+import gc
+import os
+
+# Compile the hot catalog responses into a file that every worker maps read-only
+os.environ.setdefault('WORKOUT_CATALOG_BLOB', 'workout_database.blob')
+
+# Import the app (and index the catalog) once, before forking, so workers start ready to serve
+preload_app = True
+
+def pre_fork(server, worker):
+    # Move the preloaded objects out of the collector's reach, so collections in
+    # the workers do not write to (and so copy) the pages they share with the master
+    gc.freeze()
+
+def post_fork(server, worker):
+    # Workers (respawned ones too) start from the catalog the master loaded at boot, and the
+    # master never reloads it: catch up with workout_database.json before serving a request
+    import app
+    try:
+        app.refresh_catalog()
+    except Exception as e:
+        server.log.warning("Worker %s keeps catalog %s, reload failed: %s", worker.pid, app._catalog.version, e)
+    app.start_catalog_watcher()
@@ -1,8 +1,17 @@
 // Ultimate Jeff Nippard Workout Tracker - Service Worker
-const CACHE_NAME = 'workout-tracker-v1';
-const urlsToCache = [
-  '/',
-  '/api/exercises',
+// CACHE_VERSION and urlsToCache are filled in by the server from the catalog
+// and asset content hashes, so every catalog or app update gets fresh caches.
+const CACHE_VERSION = '__CACHE_VERSION__';
+const CACHE_NAME = `workout-tracker-${CACHE_VERSION}`;
+const API_CACHE_NAME = `workout-tracker-api-${CACHE_VERSION}`;
+const API_CACHE_MAX_ENTRIES = 100;
+const API_CACHE_MAX_AGE = 7 * 24 * 60 * 60 * 1000; // Past this, prefer the network over a stale copy
+const urlsToCache = __PRECACHE_URLS__;
+// Read-only catalog endpoints, served stale-while-revalidate. Everything else under /api/
+// (history, progress, preferences, exports, catalog changes) is live per-user data: network only.
+const CATALOG_API_PATHS = [
+  '/api/exercises', '/api/program', '/api/search', '/api/facets', '/api/substitutions',
+  '/api/equipment-categories', '/api/equipment', '/api/workout-types'
 ];
 
 self.addEventListener('install', function(event) {
@@ -11,17 +20,122 @@ self.addEventListener('install', function(event) {
       .then(function(cache) {
         return cache.addAll(urlsToCache);
       })
+      .then(function() {
+        return self.skipWaiting();
+      })
   );
 });
 
-self.addEventListener('fetch', function(event) {
-  event.respondWith(
-    caches.match(event.request)
-      .then(function(response) {
-        // Return cached version or fetch from network
-        return response || fetch(event.request);
-      }
-    )
+self.addEventListener('activate', function(event) {
+  // Drop caches left behind by previous versions
+  event.waitUntil(
+    caches.keys()
+      .then(function(names) {
+        return Promise.all(names
+          .filter(function(name) {
+            return name !== CACHE_NAME && name !== API_CACHE_NAME;
+          })
+          .map(function(name) {
+            return caches.delete(name);
+          }));
+      })
+      .then(function() {
+        return self.clients.claim();
+      })
   );
 });
 
+self.addEventListener('fetch', function(event) {
+  if (event.request.method !== 'GET') {
+    return;
+  }
+  const url = new URL(event.request.url);
+  if (url.origin !== self.location.origin) {
+    return;
+  }
+
+  if (url.pathname.startsWith('/api/')) {
+    if (isCatalogRequest(url)) {
+      event.respondWith(staleWhileRevalidate(event));
+    }
+  } else if (url.pathname.startsWith('/assets/')) {
+    // Fingerprinted bundles never change, so the cached copy is always valid
+    event.respondWith(
+      caches.match(event.request)
+        .then(function(response) {
+          return response || fetch(event.request);
+        })
+    );
+  } else if (event.request.mode === 'navigate') {
+    // Always try for the latest page shell, fall back to the cached one offline
+    event.respondWith(
+      fetch(event.request)
+        .catch(function() {
+          return caches.match('/');
+        })
+    );
+  } else {
+    event.respondWith(
+      caches.match(event.request)
+        .then(function(response) {
+          // Return cached version or fetch from network
+          return response || fetch(event.request);
+        })
+    );
+  }
+});
+
+function isCatalogRequest(url) {
+  return CATALOG_API_PATHS.some(function(path) {
+    return url.pathname === path || url.pathname.startsWith(path + '/');
+  });
+}
+
+// Serve API responses from cache immediately and refresh them in the background
+function staleWhileRevalidate(event) {
+  return caches.open(API_CACHE_NAME).then(function(cache) {
+    return cache.match(event.request).then(function(cached) {
+      // Fall back to the copy precached at install time
+      return cached || caches.match(event.request);
+    }).then(function(cached) {
+      const network = fetch(event.request).then(function(response) {
+        // Redirects here mean the session expired; never cache the login page as API data
+        if (response.ok && !response.redirected) {
+          cache.put(event.request, response.clone())
+            .then(function() {
+              return trimCache(cache, API_CACHE_MAX_ENTRIES);
+            });
+        }
+        return response;
+      });
+
+      if (cached && !isExpired(cached)) {
+        event.waitUntil(network.catch(function() {}));
+        return cached;
+      }
+      if (cached) {
+        // Too old to serve first, but still better than nothing when offline
+        return network.catch(function() {
+          return cached;
+        });
+      }
+      return network;
+    });
+  });
+}
+
+function isExpired(response) {
+  const date = Date.parse(response.headers.get('Date'));
+  return !isNaN(date) && Date.now() - date > API_CACHE_MAX_AGE;
+}
+
+// Keep the API cache bounded by evicting the oldest entries first
+function trimCache(cache, maxEntries) {
+  return cache.keys().then(function(keys) {
+    return Promise.all(keys
+      .slice(0, Math.max(0, keys.length - maxEntries))
+      .map(function(key) {
+        return cache.delete(key);
+      }));
+  });
+}